@@ -0,0 +1,81 @@
+import io
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from matplotlib import colormaps
+from PIL import Image
+
+TAILLE_AFFICHAGE = 512  # Côté maximal (pixels) des images de l'animation
+MAX_ANIMATIONS = 32  # Animations encodées conservées en cache
+
+# Encodages en cours ou terminés : clé -> Future des octets GIF (ordre = ancienneté d'usage).
+# Partagé par les threads de toutes les sessions et par les rappels des threads d'encodage :
+# tout accès se fait sous _verrou.
+_animations = OrderedDict()
+_verrou = threading.Lock()
+_executeur = ThreadPoolExecutor(max_workers=2, thread_name_prefix="animation")
+
+
+# Conversion des instantanés (n, ny, nx) en indices de palette dans un tampon uint8
+# préalloué, après sous-échantillonnage à `taille_max` pixels de côté. L'échelle est
+# symétrique et commune à toutes les images (99,5e percentile de l'amplitude).
+def images_indexees(images, taille_max=TAILLE_AFFICHAGE):
+    n, ny, nx = images.shape
+    pas = max(1, int(np.ceil(max(ny, nx) / taille_max)))
+    reduites = images[:, ::pas, ::pas]
+
+    amplitude = float(np.percentile(np.abs(reduites[:, ::4, ::4]), 99.5)) or 1.0
+    indices = np.empty(reduites.shape, dtype=np.uint8)
+    for k in range(n):
+        image = np.clip(reduites[k], -amplitude, amplitude)
+        image += amplitude
+        image *= 255 / (2 * amplitude)
+        # L'axe vertical est inversé pour afficher y = 0 en bas, comme imshow(origin="lower")
+        indices[k] = image[::-1]
+    return indices
+
+
+# Encodage GIF direct des images indexées avec la palette d'une carte de couleurs
+def encoder_gif(indices, cmap="seismic", duree_image_ms=100):
+    palette = (colormaps[cmap](np.linspace(0, 1, 256))[:, :3] * 255).astype(np.uint8)
+    images = []
+    for image in indices:
+        image = Image.fromarray(image).convert("P")
+        image.putpalette(palette.tobytes())
+        images.append(image)
+    tampon = io.BytesIO()
+    images[0].save(tampon, format="GIF", save_all=True, append_images=images[1:], duration=duree_image_ms, loop=0)
+    return tampon.getvalue()
+
+
+# Un encodage en échec n'est pas conservé : il sera relancé au prochain appel
+def _oublier_echec(cle, animation):
+    if animation.exception() is not None:
+        with _verrou:
+            if _animations.get(cle) is animation:
+                del _animations[cle]
+
+
+def _produire_animation(images, cmap, duree_image_ms):
+    return encoder_gif(images_indexees(images), cmap, duree_image_ms)
+
+
+# Animation GIF des instantanés, encodée dans un thread de travail. Renvoie un Future des
+# octets ; un second appel avec la même clé réutilise l'encodage (en cours ou terminé).
+# `images` ne doit plus être modifié après l'appel.
+def animation_en_arriere_plan(cle, images, cmap="seismic", duree_image_ms=100):
+    with _verrou:
+        animation = _animations.get(cle)
+        nouvelle = animation is None
+        if nouvelle:
+            animation = _executeur.submit(_produire_animation, images, cmap, duree_image_ms)
+            _animations[cle] = animation
+            while len(_animations) > MAX_ANIMATIONS:
+                _animations.popitem(last=False)
+        _animations.move_to_end(cle)
+    # Hors du verrou : le rappel s'exécute immédiatement si l'encodage est déjà terminé
+    if nouvelle:
+        animation.add_done_callback(lambda termine: _oublier_echec(cle, termine))
+    return animation
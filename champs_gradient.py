@@ -0,0 +1,201 @@
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+from derivees_numeriques import derivee
+
+ELEMENTS_PAR_BLOC = 1 << 20  # Points évalués à la fois : borne la mémoire des temporaires
+FLECHES_MAX = 40  # Flèches par côté dans le tracé du gradient, quelle que soit la résolution
+
+# Valeurs et dérivées d'ordre 1 et 2 sur une grille (axes 1-D x et y, tableaux (ny, nx))
+Derivees = namedtuple("Derivees", ["x", "y", "z", "fx", "fy", "fxx", "fyy", "fxy"])
+
+# Points critiques : positions et nature (indice dans NATURES)
+PointsCritiques = namedtuple("PointsCritiques", ["x", "y", "nature"])
+NATURES = ("minimum", "maximum", "col", "dégénéré")
+
+
+# Liste des fonctions disponibles
+FUNCTIONS = {
+    "Polynomiale : ax^b + cy^d": lambda x, y, a, b, c, d: a * x**b + c * y**d,
+    "Exponentielle : ae^(bx) + ce^(dy)": lambda x, y, a, b, c, d: a * np.exp(b * x) + c * np.exp(d * y),
+    "Sinusoïdale : a*sin(bx) + c*cos(dy)": lambda x, y, a, b, c, d: a * np.sin(b * x) + c * np.cos(d * y),
+    "Logarithmique : a*log(bx) + c*log(dy)": lambda x, y, a, b, c, d: a * np.log(np.abs(b * x) + 1) + c * np.log(np.abs(d * y) + 1),
+    "Tangente : a*tan(bx) + c*tan(dy)": lambda x, y, a, b, c, d: a * np.tan(b * x) + c * np.tan(d * y),
+}
+
+# Mêmes fonctions sous forme symbolique (syntaxe SymPy), pour la dérivation exacte
+EXPRESSIONS = {
+    "Polynomiale : ax^b + cy^d": "a*x**b + c*y**d",
+    "Exponentielle : ae^(bx) + ce^(dy)": "a*exp(b*x) + c*exp(d*y)",
+    "Sinusoïdale : a*sin(bx) + c*cos(dy)": "a*sin(b*x) + c*cos(d*y)",
+    "Logarithmique : a*log(bx) + c*log(dy)": "a*log(Abs(b*x) + 1) + c*log(Abs(d*y) + 1)",
+    "Tangente : a*tan(bx) + c*tan(dy)": "a*tan(b*x) + c*tan(d*y)",
+}
+
+
+# Gradient de la fonction (approximatif par dérivation numérique)
+def grad_f(f, x, y, a, b, c, d):
+    h = 1e-5  # Petits pas pour l'approximation
+    df_dx = (f(x + h, y, a, b, c, d) - f(x - h, y, a, b, c, d)) / (2 * h)
+    df_dy = (f(x, y + h, a, b, c, d) - f(x, y - h, a, b, c, d)) / (2 * h)
+    return df_dx, df_dy
+
+
+# Gradient exact de la fonction `nom`, dérivé symboliquement une fois puis compilé en
+# fonction NumPy vectorisée (x, y, a, b, c, d) -> (df/dx, df/dy). Renvoie None si la
+# fonction n'a pas d'expression symbolique ou si SymPy n'est pas installé.
+@lru_cache(maxsize=None)
+def gradient_analytique(nom):
+    if nom not in EXPRESSIONS:
+        return None
+    try:
+        import sympy as sp
+    except ImportError:
+        return None
+
+    # Variables réelles : la dérivée de |u| est alors sign(u), sans partie imaginaire
+    symboles = sp.symbols("x y a b c d", real=True)
+    expression = sp.sympify(EXPRESSIONS[nom], locals={str(s): s for s in symboles})
+    # powsimp ramène b·x**b/x à b·x**(b - 1), défini en x = 0
+    derivees = [sp.powsimp(sp.diff(expression, variable), force=True) for variable in symboles[:2]]
+    return sp.lambdify(symboles, derivees, modules="numpy")
+
+
+# Gradient (df/dx, df/dy) de la fonction `nom` : exact si possible, sinon par grad_f.
+# Les composantes constantes sont étendues à la forme de la grille.
+def gradient(nom, x, y, a, b, c, d):
+    exact = gradient_analytique(nom)
+    if exact is None:
+        return grad_f(FUNCTIONS[nom], x, y, a, b, c, d)
+    forme = np.broadcast(x, y).shape
+    df_dx, df_dy = exact(x, y, a, b, c, d)
+    return np.broadcast_to(df_dx, forme), np.broadcast_to(df_dy, forme)
+
+
+# Valeurs et gradient de la fonction `nom` sur une grille régulière `resolution` × `resolution`
+# couvrant [xmin, xmax] × [ymin, ymax]. Les tableaux résultats (Z, U, V) sont préalloués
+# dans `dtype` et remplis par blocs de lignes : les temporaires de l'évaluation ne dépassent
+# jamais ELEMENTS_PAR_BLOC points, et aucune grille X, Y complète n'est construite.
+# Renvoie (x, y, Z, U, V), x et y étant les axes 1-D.
+def evaluer_champ(nom, limites, resolution, a, b, c, d, dtype=np.float64):
+    xmin, xmax, ymin, ymax = limites
+    x = np.linspace(xmin, xmax, resolution, dtype=dtype)
+    y = np.linspace(ymin, ymax, resolution, dtype=dtype)
+    Z, U, V = (np.empty((resolution, resolution), dtype=dtype) for _ in range(3))
+
+    f = FUNCTIONS[nom]
+    lignes = max(1, ELEMENTS_PAR_BLOC // resolution)
+    with np.errstate(all="ignore"):
+        for debut in range(0, resolution, lignes):
+            bloc = slice(debut, debut + lignes)
+            y_bloc = y[bloc, None]
+            Z[bloc] = f(x, y_bloc, a, b, c, d)
+            U[bloc], V[bloc] = gradient(nom, x, y_bloc, a, b, c, d)
+    return x, y, Z, U, V
+
+
+# Pas de sous-échantillonnage ramenant `resolution` points à au plus `maximum` flèches
+def pas_fleches(resolution, maximum=FLECHES_MAX):
+    return max(1, -(-resolution // maximum))
+
+
+# Valeurs et dérivées de la fonction `nom` à partir d'une seule évaluation sur la grille
+# bordée d'un point de chaque côté : toutes les dérivées (ordres 1 et 2, croisée comprise)
+# sont des différences centrées de ce tableau, sans autre appel à f. L'évaluation et les
+# stencils se font toujours en float64 (en float32, les différences secondes ne gardent
+# presque aucun chiffre significatif), par blocs de lignes bordés des deux lignes voisines
+# qu'ils lisent ; seuls les résultats sont convertis dans `dtype`.
+def evaluer_derivees(nom, limites, resolution, a, b, c, d, dtype=np.float64):
+    xmin, xmax, ymin, ymax = limites
+    hx = (xmax - xmin) / (resolution - 1)
+    hy = (ymax - ymin) / (resolution - 1)
+    x = np.linspace(xmin - hx, xmax + hx, resolution + 2)
+    y = np.linspace(ymin - hy, ymax + hy, resolution + 2)
+    champs = [np.empty((resolution, resolution), dtype=dtype) for _ in range(6)]
+
+    f = FUNCTIONS[nom]
+    lignes = max(1, ELEMENTS_PAR_BLOC // (resolution + 2))
+    interieur = (slice(1, -1), slice(1, -1))
+    for debut in range(0, resolution, lignes):
+        fin = min(debut + lignes, resolution)
+        y_bloc = y[debut:fin + 2]
+        with np.errstate(all="ignore"):
+            Z = np.asarray(f(x, y_bloc[:, None], a, b, c, d), dtype=np.float64)
+        # Stencils centrés d'ordre 2 du module partagé ; la bordure ne sert qu'aux voisins
+        fx = derivee(Z, x, axe=1)
+        blocs = (
+            Z, fx, derivee(Z, y_bloc, axe=0), derivee(Z, x, axe=1, rang=2),
+            derivee(Z, y_bloc, axe=0, rang=2), derivee(fx, y_bloc, axe=0),
+        )
+        for champ, bloc in zip(champs, blocs):
+            champ[debut:fin] = bloc[interieur]
+    return Derivees(x[1:-1].astype(dtype), y[1:-1].astype(dtype), *champs)
+
+
+def laplacien(derivees):
+    return derivees.fxx + derivees.fyy
+
+
+def determinant_hessien(derivees):
+    return derivees.fxx * derivees.fyy - derivees.fxy**2
+
+
+# Moyenne des quatre coins de chaque maille de la grille
+def _coins(champ):
+    return (champ[:-1, :-1] + champ[1:, :-1] + champ[:-1, 1:] + champ[1:, 1:]) / 4
+
+
+# Vrai pour les mailles où le champ change de signe (ou s'annule) entre deux coins
+def _change_de_signe(champ):
+    coins = (champ[:-1, :-1], champ[1:, :-1], champ[:-1, 1:], champ[1:, 1:])
+    minimum = np.minimum.reduce(coins)
+    maximum = np.maximum.reduce(coins)
+    return (minimum <= 0) & (maximum >= 0)
+
+
+# Points critiques détectés sans boucle : mailles où fx et fy changent tous deux de signe,
+# position affinée par un pas de Newton (limité à la maille) et nature donnée par la
+# hessienne interpolée au centre de la maille. Les différences finies changent aussi de
+# signe au travers d'un pôle (tangente) : un candidat n'est retenu que si f est finie aux
+# quatre coins de la maille et si le gradient exact de la fonction `nom` y change lui aussi
+# de signe (critère valable sur un pli comme |x|, où le gradient ne s'annule pas). Un point
+# situé sur une ligne de la grille est signalé par plusieurs mailles : les doublons à moins
+# d'une maille sont fusionnés.
+def points_critiques(derivees, nom, a, b, c, d):
+    x, y = derivees.x, derivees.y
+    hx, hy = x[1] - x[0], y[1] - y[0]
+    with np.errstate(invalid="ignore"):
+        candidats = _change_de_signe(derivees.fx) & _change_de_signe(derivees.fy)
+    iy, ix = np.nonzero(candidats)
+
+    fx, fy, fxx, fyy, fxy = (_coins(champ)[iy, ix] for champ in derivees[3:])
+    det = fxx * fyy - fxy**2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dx = np.nan_to_num(-(fyy * fx - fxy * fy) / det)
+        dy = np.nan_to_num(-(fxx * fy - fxy * fx) / det)
+    px = (x[ix] + x[ix + 1]) / 2 + np.clip(dx, -hx / 2, hx / 2)
+    py = (y[iy] + y[iy + 1]) / 2 + np.clip(dy, -hy / 2, hy / 2)
+
+    # Contrôle par le gradient exact aux quatre coins (4, k) de chaque maille candidate
+    coins_y = np.stack((iy, iy + 1, iy, iy + 1))
+    coins_x = np.stack((ix, ix, ix + 1, ix + 1))
+    with np.errstate(all="ignore"):
+        gx_coins, gy_coins = (np.asarray(g, dtype=float) for g in gradient(nom, x[coins_x], y[coins_y], a, b, c, d))
+        fini = np.isfinite(derivees.z[coins_y, coins_x]).all(axis=0)
+        change = (
+            (gx_coins.min(axis=0) <= 0) & (gx_coins.max(axis=0) >= 0)
+            & (gy_coins.min(axis=0) <= 0) & (gy_coins.max(axis=0) >= 0)
+        )
+    retenus = fini & change
+    px, py, fxx, fyy, det = px[retenus], py[retenus], fxx[retenus], fyy[retenus], det[retenus]
+
+    nature = np.full(len(px), NATURES.index("dégénéré"), dtype=np.int8)
+    nature[(det > 0) & (fxx > 0)] = NATURES.index("minimum")
+    nature[(det > 0) & (fxx < 0)] = NATURES.index("maximum")
+    nature[det < 0] = NATURES.index("col")
+
+    _, uniques = np.unique(np.column_stack((np.round(px / hx), np.round(py / hy), nature)), axis=0, return_index=True)
+    uniques.sort()
+    return PointsCritiques(px[uniques], py[uniques], nature[uniques])
@@ -0,0 +1 @@
+# Présence à la racine : pytest y ajoute le dossier au chemin d'import des tests
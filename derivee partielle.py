@@ -1,14 +1,20 @@
 import streamlit as st
 import numpy as np
-import sympy as sp
 import matplotlib.pyplot as plt
+from matplotlib import colormaps
 from mpl_toolkits.mplot3d import Axes3D
 import pandas as pd
 
+from expressions_symboliques import compiler_expression, evaluer_volume, gradient_expression
+
+try:
+    import plotly.graph_objects as go
+except ImportError:
+    go = None
+
 # Titre principal
 st.title("Exploration des Dérivées Partielles")
-st.markdown("Plongez dans le concept des dérivées partielles avec des visualisations 3D interactives, des exercices pratiques et des quiz pédagogiques.
-")
+st.markdown("Plongez dans le concept des dérivées partielles avec des visualisations 3D interactives, des exercices pratiques et des quiz pédagogiques.")
 
 # **1. Définition et Concepts de Dérivées Partielles**
 st.header("1. Définition et Concepts")
@@ -27,34 +33,64 @@ st.markdown("""
 Ce graphique montre comment T varie dans un espace 3D en fonction des variables x, y, et z.
 """)
 
-# Variables pour la simulation
+# Volume T(x, y, z) évalué une fois (50 × 50 points, un niveau par pas du curseur z) et
+# mis en cache : déplacer le curseur revient à lire une coupe du volume
 x_vals = np.linspace(0, 2 * np.pi, 50)
 y_vals = np.linspace(0, 2 * np.pi, 50)
-x_grid, y_grid = np.meshgrid(x_vals, y_vals)
+z_levels = np.round(np.arange(0.1, 2.0 + 1e-9, 0.1), 1)
 z_slider = st.slider("Choisissez la valeur de z :", 0.1, 2.0, 0.5, step=0.1)
 
-# Calcul de T
-T_func = lambda x, y, z: np.sin(x) * np.cos(y) * np.exp(-z)
-T_vals = T_func(x_grid, y_grid, z_slider)
 
-# Graphique 3D
-fig = plt.figure(figsize=(10, 6))
-ax = fig.add_subplot(111, projection='3d')
-ax.plot_surface(x_grid, y_grid, T_vals, cmap='viridis')
-ax.set_title("Variation de T(x, y, z)")
-ax.set_xlabel("x")
-ax.set_ylabel("y")
-ax.set_zlabel("T")
-st.pyplot(fig)
+@st.cache_data(show_spinner=False)
+def temperature_volume(expression, nx, ny, z_values):
+    evaluator = compiler_expression(expression)
+    return evaluer_volume(evaluator, np.linspace(0, 2 * np.pi, nx), np.linspace(0, 2 * np.pi, ny), np.array(z_values))
+
+
+T_volume = temperature_volume("sin(x)*cos(y)*exp(-z)", len(x_vals), len(y_vals), tuple(z_levels))
+z_index = int(np.argmin(np.abs(z_levels - z_slider)))
+T_vals = T_volume[z_index]
+
+# Rendu : surface Plotly (tracée par le navigateur) ou carte de chaleur, bien plus légères
+# que plot_surface ; l'échelle de couleurs est commune à toutes les coupes
+render_modes = (["Surface 3D interactive (Plotly)"] if go is not None else []) + ["Carte de chaleur", "Surface Matplotlib"]
+render_mode = st.radio("Rendu", render_modes, horizontal=True)
+T_min, T_max = float(T_volume.min()), float(T_volume.max())
+if render_mode == "Surface 3D interactive (Plotly)":
+    fig = go.Figure(go.Surface(x=x_vals, y=y_vals, z=T_vals, colorscale="Viridis", cmin=T_min, cmax=T_max))
+    fig.update_layout(
+        title="Variation de T(x, y, z)", height=500, margin=dict(l=0, r=0, t=40, b=0),
+        scene=dict(xaxis_title="x", yaxis_title="y", zaxis_title="T", zaxis=dict(range=[T_min, T_max])),
+    )
+    st.plotly_chart(fig, use_container_width=True)
+elif render_mode == "Carte de chaleur":
+    # Couleurs appliquées directement au tableau, sans figure Matplotlib ; ligne 0 = y min en bas
+    colors = colormaps["viridis"]((T_vals - T_min) / (T_max - T_min or 1.0))[::-1, :, :3]
+    st.image((colors * 255).astype(np.uint8), caption=f"T(x, y, z = {z_slider}) sur [0, 2π]²", width=400)
+else:
+    x_grid, y_grid = np.meshgrid(x_vals, y_vals)
+    fig = plt.figure(figsize=(10, 6))
+    ax = fig.add_subplot(111, projection='3d')
+    ax.plot_surface(x_grid, y_grid, T_vals, cmap='viridis')
+    ax.set_title("Variation de T(x, y, z)")
+    ax.set_xlabel("x")
+    ax.set_ylabel("y")
+    ax.set_zlabel("T")
+    st.pyplot(fig)
 
 # **3. Exercices Guidés**
 st.header("3. Exercices Guidés")
 st.markdown("""
-### Exercice 1 : Calcul de ∂T/∂z pour T(x, y, z) = 10x² + 5y - 2z
+### Exercice 1 : Calcul de ∂T/∂z pour une température T(x, y, z)
 """)
-x, y, z = sp.symbols("x y z")
-T_expr = 10 * x**2 + 5 * y - 2 * z
-partial_derivative_z = sp.diff(T_expr, z)
+# Expression analysée, dérivée et compilée une seule fois par texte saisi
+T_text = st.text_input("Expression de T(x, y, z) :", "10*x**2 + 5*y - 2*z")
+try:
+    T_evaluator = compiler_expression(T_text)
+except ValueError as error:
+    st.error(str(error))
+    T_evaluator = compiler_expression("10*x**2 + 5*y - 2*z")
+partial_derivative_z = T_evaluator.derivees["z"]
 
 st.write(f"**La dérivée partielle de T par rapport à z est :** {partial_derivative_z}")
 
@@ -63,12 +99,24 @@ x_input = st.number_input("Entrez une valeur pour x :", value=1.0, step=0.1)
 y_input = st.number_input("Entrez une valeur pour y :", value=2.0, step=0.1)
 z_input = st.number_input("Entrez une valeur pour z :", value=0.5, step=0.1)
 
-T_value = T_expr.subs({x: x_input, y: y_input, z: z_input})
-partial_z_value = partial_derivative_z.subs({z: z_input})
+T_value = float(T_evaluator.valeur(x_input, y_input, z_input))
+partial_z_value = float(T_evaluator.partielles["z"](x_input, y_input, z_input))
 
 st.write(f"**À x = {x_input}, y = {y_input}, z = {z_input} :**")
-st.write(f"Valeur de T : {T_value}")
-st.write(f"Dérivée partielle ∂T/∂z : {partial_z_value}")
+st.write(f"Valeur de T : {T_value:.6g}")
+st.write(f"Dérivée partielle ∂T/∂z : {partial_z_value:.6g}")
+
+# Gradient complet sur une grille (x, y) au niveau z choisi, évalué d'un bloc
+st.markdown(f"**Norme du gradient |∇T| dans le plan z = {z_input}**")
+grid_x, grid_y = np.meshgrid(np.linspace(-5, 5, 200), np.linspace(-5, 5, 200))
+T_gradient = gradient_expression(T_evaluator, grid_x, grid_y, np.full_like(grid_x, z_input))
+fig, ax = plt.subplots(figsize=(6, 5))
+image = ax.imshow(np.sqrt(sum(component**2 for component in T_gradient)), extent=[-5, 5, -5, 5], origin="lower",
+                  cmap="magma")
+fig.colorbar(image, ax=ax, label="|∇T|")
+ax.set_xlabel("x")
+ax.set_ylabel("y")
+st.pyplot(fig)
 
 # **4. Quiz interactif**
 st.header("4. Quiz Interactif")
@@ -107,7 +155,7 @@ st.markdown("Téléchargez les résultats de vos calculs et exercices.")
 data = {
     "Exercice": ["Exercice 1", "Quiz Question 1", "Quiz Question 2"],
     "Résultat": [
-        f"T = {T_value}, ∂T/∂z = {partial_z_value}",
+        f"T = {T_value:.6g}, ∂T/∂z = {partial_z_value:.6g}",
         "Correct" if question_1 == "T diminue avec z" else "Incorrect",
         "Correct" if question_2 == "2x" else "Incorrect",
     ],
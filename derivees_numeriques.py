@@ -0,0 +1,136 @@
+import numpy as np
+
+ORDRES = (2, 4, 6)  # Ordres de précision disponibles
+ELEMENTS_PAR_BLOC = 1 << 20  # Éléments traités à la fois : borne la mémoire des temporaires
+
+
+# Nombre de points du stencil : impair (centré à l'intérieur), le plus petit donnant l'ordre
+# de précision demandé sur une grille régulière pour la dérivée de rang `rang`. Sur les bords,
+# le stencil décentré de même taille garde cet ordre pour la dérivée première et en perd un
+# pour la dérivée seconde.
+def taille_stencil(ordre, rang=1):
+    if ordre not in ORDRES:
+        raise ValueError(f"Ordre de précision non disponible : {ordre} (choix : {ORDRES})")
+    return 2 * ((ordre + rang - 1) // 2) + 1
+
+
+# Poids de différences finies de la dérivée `rang`-ième en chacun des n nœuds de l'axe
+# `coordonnees` (positions croissantes, espacement quelconque). Chaque nœud utilise p nœuds
+# consécutifs, centrés sauf près des bords où la fenêtre est décalée vers l'intérieur.
+# Les poids résolvent le système de Vandermonde Σ w_j s_j^k / k! = δ(k, rang) pour tous
+# les nœuds à la fois. Renvoie (debuts (n,), poids (n, p)).
+def poids_stencil(coordonnees, p, rang=1):
+    coordonnees = np.asarray(coordonnees, dtype=float)
+    n = len(coordonnees)
+    if n < p:
+        raise ValueError(f"Il faut au moins {p} nœuds sur l'axe pour ce stencil ({n} fournis).")
+    debuts = np.clip(np.arange(n) - p // 2, 0, n - p)
+    decalages = coordonnees[debuts[:, None] + np.arange(p)] - coordonnees[:, None]  # (n, p)
+
+    # Décalages ramenés à l'espacement local pour le conditionnement du système
+    echelle = (decalages[:, -1] - decalages[:, 0]) / (p - 1)
+    s = decalages / echelle[:, None]
+    puissances = np.arange(p)
+    factorielles = np.cumprod(np.concatenate(([1.0], np.arange(1, p))))
+    vandermonde = s[:, None, :] ** puissances[None, :, None] / factorielles[None, :, None]  # (n, k, j)
+    second_membre = np.zeros((n, p, 1))
+    second_membre[:, rang, 0] = 1.0
+    poids = np.linalg.solve(vandermonde, second_membre)[:, :, 0]
+    return debuts, poids / echelle[:, None] ** rang
+
+
+def _axe_coordonnees(coordonnees, n):
+    if np.ndim(coordonnees) == 0:
+        return np.arange(n) * float(coordonnees)
+    return np.asarray(coordonnees, dtype=float)
+
+
+def _vue(tableau, axe, tranche):
+    index = [slice(None)] * tableau.ndim
+    index[axe] = tranche
+    return tableau[tuple(index)]
+
+
+# Application du stencil le long de `axe` à un tableau en mémoire, résultat écrit dans
+# `sortie`. Le nœud de sortie i lit bloc[debuts[i]:debuts[i] + p] ; `decalage` est la position
+# dans le bloc du premier nœud de sortie. Les nœuds centrés lisent des tranches décalées du
+# bloc (vues, sans copie), avec des poids scalaires si l'espacement est uniforme ; seuls les
+# nœuds de bord (stencils décentrés) passent par une indexation. Les poids sont convertis
+# dans le type de la sortie pour ne jamais créer de temporaire float64 depuis du float32.
+def _appliquer(bloc, axe, debuts, poids, sortie, decalage=0):
+    m, p = poids.shape
+    poids = poids.astype(sortie.dtype, copy=False)
+    forme_poids = [1] * bloc.ndim
+    forme_poids[axe] = -1
+
+    centres = np.flatnonzero(debuts == np.arange(m) + decalage - p // 2)
+    if len(centres):
+        premier, dernier = centres[0], centres[-1] + 1
+        poids_centres = poids[premier:dernier]
+        uniformes = np.allclose(poids_centres, poids_centres[:1], rtol=1e-9, atol=0)
+        sortie_centres = _vue(sortie, axe, slice(premier, dernier))
+        terme = np.empty(sortie_centres.shape, dtype=sortie.dtype)
+        for j in range(p):
+            voisins = _vue(bloc, axe, slice(debuts[premier] + j, debuts[premier] + j + dernier - premier))
+            w = poids_centres[0, j] if uniformes else poids_centres[:, j].reshape(forme_poids)
+            if j == 0:
+                np.multiply(voisins, w, out=sortie_centres, casting="unsafe")
+            else:
+                np.multiply(voisins, w, out=terme, casting="unsafe")
+                sortie_centres += terme
+    else:
+        premier = dernier = 0
+
+    # Nœuds de bord, au plus p - 1 de chaque côté de l'axe
+    bords = np.r_[0:premier, dernier:m]
+    if len(bords):
+        valeurs = np.zeros(np.take(sortie, bords, axis=axe).shape, dtype=sortie.dtype)
+        for j in range(p):
+            valeurs += poids[bords, j].reshape(forme_poids) * np.take(bloc, debuts[bords] + j, axis=axe)
+        index = [slice(None)] * bloc.ndim
+        index[axe] = bords
+        sortie[tuple(index)] = valeurs
+    return sortie
+
+
+# Dérivée `rang`-ième (1 ou 2) d'un champ N-D le long de `axe`, d'ordre de précision
+# `ordre` (2, 4 ou 6). `coordonnees` est l'espacement (scalaire) ou les positions des nœuds
+# de l'axe (tableau 1-D, espacement non uniforme). Le calcul se fait par blocs contigus d'au
+# plus `elements_par_bloc` éléments, découpés selon l'axe le plus extérieur (avec les p - 1
+# voisins nécessaires s'il s'agit de l'axe dérivé), ce qui borne les temporaires que le champ
+# soit en mémoire ou projeté en mémoire (np.load(..., mmap_mode="r")). Le résultat peut être
+# écrit directement dans `sortie` (par exemple np.lib.format.open_memmap).
+def derivee(champ, coordonnees, axe=0, ordre=2, rang=1, sortie=None, elements_par_bloc=ELEMENTS_PAR_BLOC):
+    axe = axe % champ.ndim
+    n = champ.shape[axe]
+    debuts, poids = poids_stencil(_axe_coordonnees(coordonnees, n), taille_stencil(ordre, rang), rang)
+    p = poids.shape[1]
+    if sortie is None:
+        sortie = np.empty(champ.shape, dtype=np.result_type(champ.dtype, np.float32))
+    if champ.size <= elements_par_bloc:
+        return _appliquer(np.asarray(champ), axe, debuts, poids, sortie)
+
+    decoupe = next(k for k in range(champ.ndim) if champ.shape[k] > 1)
+    tranche = max(1, elements_par_bloc // (champ.size // champ.shape[decoupe]))
+    for debut in range(0, champ.shape[decoupe], tranche):
+        fin = min(debut + tranche, champ.shape[decoupe])
+        if decoupe == axe:
+            # Nœuds debut:fin et les voisins qu'ils lisent
+            bas, haut = debuts[debut], debuts[fin - 1] + p
+            _appliquer(
+                np.asarray(_vue(champ, axe, slice(bas, haut))), axe, debuts[debut:fin] - bas, poids[debut:fin],
+                _vue(sortie, axe, slice(debut, fin)), decalage=debut - bas,
+            )
+        else:
+            bloc = np.asarray(_vue(champ, decoupe, slice(debut, fin)))
+            _appliquer(bloc, axe, debuts, poids, _vue(sortie, decoupe, slice(debut, fin)))
+    return sortie
+
+
+# Gradient N-D : liste des dérivées premières selon chaque axe, `coordonnees` donnant pour
+# chaque axe un espacement ou un tableau de positions
+def gradient_nd(champ, coordonnees, ordre=2, elements_par_bloc=ELEMENTS_PAR_BLOC):
+    return [
+        derivee(champ, coordonnees[axe], axe=axe, ordre=ordre, elements_par_bloc=elements_par_bloc)
+        for axe in range(champ.ndim)
+    ]
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# Les copies binaires sont rangées à côté du fichier source, dans "<fichier>.cache/"
+SUFFIXE_CACHE = ".cache"
+TAILLE_BLOC = 1_000_000  # Lignes lues par bloc lors de la conversion du CSV
+
+# Table en colonnes : `colonnes` associe un nom à un tableau projeté en mémoire ; les colonnes
+# textuelles y sont stockées en codes entiers dont `categories[nom]` donne les libellés
+Tableau = namedtuple("Tableau", ["colonnes", "categories"])
+
+# Inventaire régional pivoté : `emissions` a la forme (len(regions), len(annees))
+InventaireRegional = namedtuple("InventaireRegional", ["regions", "annees", "emissions"])
+
+# Tables déjà ouvertes dans ce processus : chemin -> (signature, colonnes)
+_tables_ouvertes = {}
+
+
+# Empreinte SHA-256 du fichier, lue par blocs pour les gros inventaires
+def _empreinte(chemin):
+    h = hashlib.sha256()
+    with open(chemin, "rb") as fichier:
+        for bloc in iter(lambda: fichier.read(1 << 20), b""):
+            h.update(bloc)
+    return h.hexdigest()
+
+
+def _lire_meta(dossier):
+    try:
+        with open(os.path.join(dossier, "meta.json"), encoding="utf-8") as fichier:
+            return json.load(fichier)
+    except (OSError, ValueError):
+        return None
+
+
+def _ecrire_meta(dossier, meta):
+    chemin_tmp = os.path.join(dossier, "meta.json.tmp")
+    with open(chemin_tmp, "w", encoding="utf-8") as fichier:
+        json.dump(meta, fichier)
+    os.replace(chemin_tmp, os.path.join(dossier, "meta.json"))
+
+
+# Conversion du CSV en un fichier .npy par colonne (stockage en colonnes) ;
+# renvoie les libellés des colonnes textuelles, codées en entiers. Les colonnes de
+# `textuelles` sont toujours lues comme du texte, même si elles ne contiennent que des
+# chiffres, pour que leurs codes soient cohérents d'un bloc à l'autre.
+def _convertir(chemin, dossier, colonnes, sep, entete, textuelles):
+    morceaux = {nom: [] for nom in colonnes}
+    index_libelles = {nom: {} for nom in textuelles}
+    lecteur = pd.read_csv(
+        chemin, header=entete, names=colonnes, sep=sep, chunksize=TAILLE_BLOC,
+        dtype={nom: str for nom in textuelles},
+    )
+    for bloc in lecteur:
+        for nom in colonnes:
+            valeurs = bloc[nom]
+            if nom not in textuelles and valeurs.dtype.kind in "iufb":
+                morceaux[nom].append(valeurs.to_numpy())
+                continue
+            # Codes locaux au bloc, ramenés aux codes globaux de la colonne
+            codes, libelles = pd.factorize(valeurs.astype(str))
+            index = index_libelles.setdefault(nom, {})
+            globaux = np.array([index.setdefault(libelle, len(index)) for libelle in libelles], dtype=np.int32)
+            morceaux[nom].append(globaux[codes])
+
+    # Écriture dans un fichier temporaire puis remplacement : les projections mémoire
+    # encore ouvertes sur l'ancienne copie restent valides
+    for nom, valeurs in morceaux.items():
+        destination = os.path.join(dossier, f"{nom}.npy")
+        with open(destination + ".tmp", "wb") as fichier:
+            np.save(fichier, np.concatenate(valeurs) if valeurs else np.empty(0))
+        os.replace(destination + ".tmp", destination)
+
+    return {nom: list(index) for nom, index in index_libelles.items()}
+
+
+# Chargement d'un tableau CSV sous forme de colonnes NumPy projetées en mémoire.
+# Le CSV n'est analysé qu'une fois : les appels suivants relisent la copie binaire,
+# reconstruite dès que la date de modification et le contenu du source changent.
+# Les colonnes de `textuelles` sont codées en entiers quel que soit leur contenu.
+def charger_tableau(chemin, colonnes, sep=";", entete=None, textuelles=()):
+    chemin = os.path.abspath(chemin)
+    colonnes = list(colonnes)
+    textuelles = sorted(textuelles)
+    statut = os.stat(chemin)
+    signature = (statut.st_mtime_ns, statut.st_size, tuple(colonnes), tuple(textuelles))
+
+    deja_ouvert = _tables_ouvertes.get(chemin)
+    if deja_ouvert is not None and deja_ouvert[0] == signature:
+        return deja_ouvert[1]
+
+    dossier = chemin + SUFFIXE_CACHE
+    meta = _lire_meta(dossier)
+    valide = (
+        meta is not None and meta["colonnes"] == colonnes and meta.get("textuelles", []) == textuelles
+        and meta["taille"] == statut.st_size
+    )
+    if valide and meta["mtime_ns"] != statut.st_mtime_ns:
+        # Fichier touché : on ne reconvertit que si son contenu a réellement changé
+        empreinte = _empreinte(chemin)
+        valide = empreinte == meta["sha256"]
+        if valide:
+            meta["mtime_ns"] = statut.st_mtime_ns
+            _ecrire_meta(dossier, meta)
+
+    if not valide:
+        os.makedirs(dossier, exist_ok=True)
+        if meta is not None:
+            os.remove(os.path.join(dossier, "meta.json"))
+        categories = _convertir(chemin, dossier, colonnes, sep, entete, textuelles)
+        meta = {
+            "colonnes": colonnes,
+            "textuelles": textuelles,
+            "categories": categories,
+            "mtime_ns": statut.st_mtime_ns,
+            "taille": statut.st_size,
+            "sha256": _empreinte(chemin),
+        }
+        _ecrire_meta(dossier, meta)
+
+    table = Tableau(
+        {nom: np.load(os.path.join(dossier, f"{nom}.npy"), mmap_mode="r") for nom in colonnes},
+        meta.get("categories", {}),
+    )
+    _tables_ouvertes[chemin] = (signature, table)
+    return table
+
+
+# Série mondiale d'émissions (fichier sans en-têtes "année;émissions")
+def charger_emissions(chemin="emission.csv"):
+    table = charger_tableau(chemin, ["Year", "Emissions"])
+    return table.colonnes["Year"], table.colonnes["Emissions"]
+
+
+# Inventaire au format long (une ligne par région et par année), pivoté en une matrice
+# régions × années ; les années absentes d'une région valent 0 et les doublons sont sommés.
+# La colonne des régions est toujours traitée comme du texte (codes numériques ISO compris).
+# Lève ValueError si le fichier ne peut pas être lu ou si les années ou les émissions ne
+# sont pas toutes numériques.
+def charger_inventaire(chemin, colonnes=("Region", "Year", "Emissions"), sep=";", entete=0):
+    nom_region, nom_annee, nom_emissions = colonnes
+    try:
+        table = charger_tableau(chemin, colonnes, sep=sep, entete=entete, textuelles=(nom_region,))
+    except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError) as erreur:
+        raise ValueError(f"Inventaire illisible : {erreur}") from erreur
+    if len(table.colonnes[nom_region]) == 0:
+        raise ValueError("Inventaire vide.")
+    for nom in (nom_annee, nom_emissions):
+        if nom in table.categories or not np.isfinite(table.colonnes[nom]).all():
+            raise ValueError(f"Inventaire mal formé : la colonne {nom} doit être entièrement numérique.")
+    codes = table.colonnes[nom_region]
+    annees_brutes = table.colonnes[nom_annee]
+    valeurs = table.colonnes[nom_emissions]
+    if not np.array_equal(annees_brutes, np.round(annees_brutes)):
+        raise ValueError(f"Inventaire mal formé : la colonne {nom_annee} doit contenir des années entières.")
+
+    regions = table.categories[nom_region]
+    premiere, derniere = int(annees_brutes.min()), int(annees_brutes.max())
+    n_annees = derniere - premiere + 1
+
+    # Pivot par comptage pondéré sur l'index linéaire (région, année)
+    index = codes.astype(np.int64) * n_annees + (annees_brutes - premiere).astype(np.int64)
+    emissions = np.bincount(index, weights=valeurs, minlength=len(regions) * n_annees)
+    emissions = emissions.reshape(len(regions), n_annees)
+
+    return InventaireRegional(regions, np.arange(premiere, derniere + 1), emissions)
@@ -0,0 +1,260 @@
+import inspect
+from collections import namedtuple
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse import linalg as sparse_linalg
+from scipy.sparse.csgraph import connected_components
+
+try:
+    import pyamg
+except ImportError:
+    pyamg = None
+
+# Perméabilité intrinsèque par matériau (m²)
+PERMEABILITES = {
+    "Sable": 1e-12,
+    "Gravier": 1e-10,
+    "Argile": 1e-14,
+    "Roche poreuse": 1e-13,
+}
+
+TOLERANCE = 1e-8  # Résidu relatif visé par le gradient conjugué
+MAX_ITERATIONS = 20000
+METHODES = ("amg", "agregation", "jacobi")  # Préconditionneurs disponibles
+# Nom du résidu relatif de scipy.sparse.linalg.cg : `tol` jusqu'à SciPy 1.11, `rtol` ensuite
+ARGUMENT_TOLERANCE = "rtol" if "rtol" in inspect.signature(sparse_linalg.cg).parameters else "tol"
+
+# Multigrille par agrégation (repli sans pyamg)
+MAILLES_NIVEAU_GROSSIER = 4096  # Taille du niveau résolu directement
+LISSAGES = 2  # Itérations de Jacobi avant et après chaque correction grossière
+AMORTISSEMENT_JACOBI = 0.67
+SEUIL_COUPLAGE = 0.1  # Couplage |a_ij| / sqrt(a_ii a_jj) minimal pour agréger deux mailles
+SURCORRECTION = 1.5  # Facteur appliqué à la correction grossière (agrégats constants par morceaux)
+REDUCTION_MIN = 0.9  # Au-delà de cette part de nœuds conservés, agrégation par blocs entiers
+
+# Solution d'un écoulement de Darcy stationnaire sur une grille de `forme` mailles :
+# - `pression` (Pa) au centre des mailles ;
+# - `vitesses` : par axe, vitesse de Darcy (m/s) sur les faces normales à l'axe, de
+#   forme n + 1 le long de cet axe (faces de bord comprises), positive dans le sens de l'axe ;
+# - `flux_bords` : débit (m³/s) sortant par chaque bord (axe, côté), côté 0 au début de
+#   l'axe et 1 à la fin ;
+# - `iterations` et `residu` relatif du solveur.
+ResultatDarcy = namedtuple("ResultatDarcy", ["pression", "vitesses", "flux_bords", "iterations", "residu"])
+
+
+# Champ de perméabilité stratifié : `couches` est une suite de (fraction d'épaisseur,
+# matériau) empilées le long de `axe`, de l'indice 0 vers la fin ; les fractions sont
+# normalisées par leur somme
+def permeabilite_couches(forme, couches, axe=-1):
+    n = forme[axe]
+    fractions = np.array([fraction for fraction, _ in couches], dtype=float)
+    limites = np.round(np.cumsum(fractions) / fractions.sum() * n).astype(int)
+    profil = np.empty(n)
+    debut = 0
+    for fin, (_, materiau) in zip(limites, couches):
+        profil[debut:fin] = PERMEABILITES[materiau]
+        debut = fin
+    forme_profil = [1] * len(forme)
+    forme_profil[axe] = n
+    return np.broadcast_to(profil.reshape(forme_profil), forme).copy()
+
+
+# Grille d'environ `mailles` mailles cubiques (carrées en 2-D) couvrant un domaine de
+# `dimensions` (m par axe) : les mailles très allongées dégradent le préconditionneur.
+# Renvoie (forme, pas).
+def grille_reguliere(dimensions, mailles):
+    cote = (np.prod(dimensions) / mailles) ** (1 / len(dimensions))
+    forme = tuple(max(2, int(round(dimension / cote))) for dimension in dimensions)
+    pas = tuple(dimension / n for dimension, n in zip(dimensions, forme))
+    return forme, pas
+
+
+# Moyenne harmonique de deux perméabilités voisines (conductance de deux demi-mailles en série)
+def _harmonique(k1, k2):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(k1 + k2 > 0, 2 * k1 * k2 / (k1 + k2), 0.0)
+
+
+def _tranche(ndim, axe, index):
+    selection = [slice(None)] * ndim
+    selection[axe] = index
+    return tuple(selection)
+
+
+# Assemblage du système volumes finis A p = b (A symétrique définie positive) : une
+# conductance par face intérieure, et pour chaque bord à pression imposée une conductance
+# de demi-maille vers la pression du bord. Les autres bords sont imperméables.
+# Renvoie (A, b, conductances intérieures par axe, conductances de bord par (axe, côté)).
+def assembler_darcy(permeabilite, pas, viscosite, pressions_bords, epaisseur=1.0):
+    permeabilite = np.asarray(permeabilite, dtype=float)
+    forme = permeabilite.shape
+    ndim = len(forme)
+    n = permeabilite.size
+    indices = np.arange(n).reshape(forme)
+    # En 2-D, `epaisseur` est la dimension hors plan (m) qui donne l'aire des faces
+    volume = np.prod(pas) * (epaisseur if ndim == 2 else 1.0)
+
+    lignes, colonnes, valeurs = [], [], []
+    diagonale = np.zeros(n)
+    b = np.zeros(n)
+    interieures, de_bord = [], {}
+    for axe in range(ndim):
+        aire = volume / pas[axe]
+        gauche, droite = _tranche(ndim, axe, slice(None, -1)), _tranche(ndim, axe, slice(1, None))
+        conductance = aire / pas[axe] * _harmonique(permeabilite[gauche], permeabilite[droite]) / viscosite
+        interieures.append(conductance)
+        i, j, t = indices[gauche].ravel(), indices[droite].ravel(), conductance.ravel()
+        lignes += [i, j]
+        colonnes += [j, i]
+        valeurs += [-t, -t]
+        np.add.at(diagonale, i, t)
+        np.add.at(diagonale, j, t)
+
+        for cote, index in ((0, 0), (1, -1)):
+            if (axe, cote) in pressions_bords:
+                bord = _tranche(ndim, axe, index)
+                t_bord = aire / (pas[axe] / 2) * permeabilite[bord] / viscosite
+                de_bord[(axe, cote)] = t_bord
+                np.add.at(diagonale, indices[bord].ravel(), t_bord.ravel())
+                np.add.at(b, indices[bord].ravel(), (t_bord * pressions_bords[(axe, cote)]).ravel())
+
+    lignes.append(np.arange(n))
+    colonnes.append(np.arange(n))
+    valeurs.append(diagonale)
+    A = sparse.csr_matrix(
+        (np.concatenate(valeurs), (np.concatenate(lignes), np.concatenate(colonnes))), shape=(n, n)
+    )
+    return A, b, interieures, de_bord
+
+
+# Multigrille par agrégation sur la grille structurée, sans dépendance : chaque niveau
+# regroupe les nœuds d'un même bloc 2 × 2 (× 2) de la grille, mais seulement s'ils sont
+# reliés par des couplages forts (|a_ij| ≥ SEUIL_COUPLAGE·sqrt(a_ii a_jj)) : un bloc à
+# cheval sur un contraste de perméabilité (couche, lentille) donne plusieurs agrégats, sans
+# quoi la convergence s'effondre sur les milieux très contrastés. L'opérateur grossier
+# P^T A P somme les conductances entre agrégats, et un cycle en V (Jacobi amorti avant et
+# après la correction, surcorrigée d'un facteur SURCORRECTION, résolution directe sur le
+# niveau le plus grossier) sert de préconditionneur symétrique.
+def _multigrille_agregation(A, forme):
+    niveaux = []
+    operateur = A
+    positions = np.indices(forme).reshape(len(forme), -1)  # Position de bloc de chaque nœud
+    while operateur.shape[0] > MAILLES_NIVEAU_GROSSIER:
+        n = operateur.shape[0]
+        positions = positions // 2
+        blocs = np.ravel_multi_index(tuple(positions), tuple(positions.max(axis=1) + 1))
+        couplages = operateur.tocoo()
+        diagonale = operateur.diagonal()
+        lignes, colonnes = couplages.row, couplages.col
+        forts = (
+            (lignes != colonnes) & (blocs[lignes] == blocs[colonnes])
+            & (-couplages.data >= SEUIL_COUPLAGE * np.sqrt(diagonale[lignes] * diagonale[colonnes]))
+        )
+        graphe = sparse.csr_matrix((np.ones(np.count_nonzero(forts)), (lignes[forts], colonnes[forts])), shape=(n, n))
+        n_agregats, agregats = connected_components(graphe, directed=False)
+        if n_agregats > REDUCTION_MIN * n:
+            # Couplages presque tous faibles (contraste de maille à maille) : blocs entiers
+            _, agregats = np.unique(blocs, return_inverse=True)
+            n_agregats = int(agregats.max()) + 1
+        P = sparse.csr_matrix((np.ones(n), (np.arange(n), agregats)), shape=(n, n_agregats))
+        niveaux.append((operateur, AMORTISSEMENT_JACOBI / diagonale, P))
+        positions_agregats = np.empty((len(positions), n_agregats), dtype=positions.dtype)
+        positions_agregats[:, agregats] = positions
+        operateur, positions = (P.T @ operateur @ P).tocsr(), positions_agregats
+    grossier = sparse_linalg.splu(operateur.tocsc())
+
+    def cycle(b, niveau=0):
+        if niveau == len(niveaux):
+            return grossier.solve(b)
+        operateur, jacobi, P = niveaux[niveau]
+        x = jacobi * b
+        for _ in range(LISSAGES - 1):
+            x += jacobi * (b - operateur @ x)
+        x += SURCORRECTION * (P @ cycle(P.T @ (b - operateur @ x), niveau + 1))
+        for _ in range(LISSAGES):
+            x += jacobi * (b - operateur @ x)
+        return x
+
+    return sparse_linalg.LinearOperator(A.shape, lambda v: cycle(np.ravel(v)))
+
+
+# Préconditionneur du gradient conjugué : multigrille algébrique de pyamg si le paquet est
+# installé, sinon multigrille par agrégation de ce module ; Jacobi (diagonale) en dernier recours
+def preconditionneur(A, forme, methode=None):
+    if methode is None:
+        methode = "amg" if pyamg is not None else "agregation"
+    if methode == "amg":
+        if pyamg is None:
+            raise ValueError("Le préconditionneur multigrille algébrique nécessite le paquet pyamg.")
+        return pyamg.smoothed_aggregation_solver(A).aspreconditioner(cycle="V")
+    if methode == "agregation":
+        return _multigrille_agregation(A, forme)
+    if methode == "jacobi":
+        return sparse.diags(1.0 / A.diagonal())
+    raise ValueError(f"Préconditionneur inconnu : {methode} (choix : {METHODES})")
+
+
+# Écoulement stationnaire de Darcy (div(k/η grad p) = 0) sur une grille 2-D ou 3-D de mailles
+# de `pas` (m par axe), perméabilité `permeabilite` (m²) par maille et viscosité `viscosite`
+# (Pa·s). `pressions_bords` associe (axe, côté) à une pression imposée (Pa), les autres bords
+# étant imperméables. Le système est résolu par gradient conjugué préconditionné.
+def resoudre_darcy(permeabilite, pas, viscosite, pressions_bords, epaisseur=1.0, methode=None,
+                   tolerance=TOLERANCE):
+    permeabilite = np.asarray(permeabilite, dtype=float)
+    forme = permeabilite.shape
+    ndim = len(forme)
+    if not pressions_bords:
+        raise ValueError("Il faut au moins un bord à pression imposée.")
+    A, b, interieures, de_bord = assembler_darcy(permeabilite, pas, viscosite, pressions_bords, epaisseur)
+
+    # Mise à l'échelle par la diagonale : les conductances (k / η ~ 1e-11) restent O(1)
+    echelle = 1.0 / np.sqrt(A.diagonal())
+    D = sparse.diags(echelle)
+    A_norme = (D @ A @ D).tocsr()
+    b_norme = echelle * b
+    iterations = [0]
+
+    def compter(_):
+        iterations[0] += 1
+
+    # Départ : moyenne des pressions imposées
+    depart = np.full(A.shape[0], np.mean(list(pressions_bords.values()))) / echelle
+    solution, info = sparse_linalg.cg(
+        A_norme, b_norme, x0=depart, maxiter=MAX_ITERATIONS,
+        M=preconditionneur(A_norme, forme, methode), callback=compter, **{ARGUMENT_TOLERANCE: tolerance},
+    )
+    if info > 0:
+        raise RuntimeError(f"Le gradient conjugué n'a pas convergé en {info} itérations.")
+    residu = np.linalg.norm(b_norme - A_norme @ solution) / np.linalg.norm(b_norme)
+    pression = (echelle * solution).reshape(forme)
+
+    # Vitesses de Darcy sur les faces, débits sortants par les bords
+    volume = np.prod(pas) * (epaisseur if ndim == 2 else 1.0)
+    vitesses, flux_bords = [], {}
+    for axe in range(ndim):
+        aire = volume / pas[axe]
+        faces = list(forme)
+        faces[axe] += 1
+        vitesse = np.zeros(faces)
+        gauche, droite = _tranche(ndim, axe, slice(None, -1)), _tranche(ndim, axe, slice(1, None))
+        vitesse[_tranche(ndim, axe, slice(1, -1))] = interieures[axe] * (pression[gauche] - pression[droite]) / aire
+        for cote, index, face, signe in ((0, 0, 0, 1), (1, -1, -1, -1)):
+            if (axe, cote) in de_bord:
+                bord = _tranche(ndim, axe, index)
+                entrant = de_bord[(axe, cote)] * (pressions_bords[(axe, cote)] - pression[bord])
+                vitesse[_tranche(ndim, axe, face)] = signe * entrant / aire
+                flux_bords[(axe, cote)] = -float(entrant.sum())
+            else:
+                flux_bords[(axe, cote)] = 0.0
+        vitesses.append(vitesse)
+    return ResultatDarcy(pression, vitesses, flux_bords, iterations[0], float(residu))
+
+
+# Vitesse de Darcy au centre des mailles (moyenne des deux faces), par axe
+def vitesses_centrees(resultat):
+    centrees = []
+    for axe, vitesse in enumerate(resultat.vitesses):
+        ndim = vitesse.ndim
+        centrees.append((vitesse[_tranche(ndim, axe, slice(None, -1))] + vitesse[_tranche(ndim, axe, slice(1, None))]) / 2)
+    return centrees
@@ -1,39 +1,59 @@
+import os
+
 import numpy as np
 import matplotlib.pyplot as plt
-import pandas as pd
 import streamlit as st
 
+from donnees_emissions import charger_emissions, charger_inventaire
+from modele_carbone import (
+    classer_regions,
+    PARAMETRES_SENSIBLES,
+    echantillonner_hypercube,
+    etat_a,
+    raccorder,
+    reduction_sous_plafond,
+    reponse_impulsionnelle,
+    reprendre,
+    sensibilites_temperature,
+    simuler_ensemble,
+    simuler_regions,
+    simuler_reponse,
+    simulation_historique,
+    variation_relative,
+)
+from scenarios_emissions import SCENARIOS, lineaire_par_morceaux, lire_points, matrice_scenarios, prolonger_historique
+
 # Configuration de la page Streamlit
 st.set_page_config(page_title="Simulation des Réservoirs de Carbone", layout="wide")
 
-# Charger les données d'émissions (fichier sans en-têtes)
-data = pd.read_csv('emission.csv', header=None, sep=';')
-data.columns = ['Year', 'Emissions']
-
-# Extraire les colonnes
-annees = data['Year']
-emissions = data['Emissions']
+# Charger les données d'émissions (copie binaire mise en cache du fichier sans en-têtes)
+annees, emissions = charger_emissions('emission.csv')
 
 # Ajouter des options pour les scénarios
 st.sidebar.header("Choix du scénario à partir de 2020")
+scenarios = dict(SCENARIOS)
 scenario = st.sidebar.selectbox(
     "Scénario d'émissions anthropiques",
-    ["Business as usual", "-2%/an", "-5%/an"]
+    list(scenarios) + ["Personnalisé (points de passage)"]
 )
+if scenario == "Personnalisé (points de passage)":
+    texte_points = st.sidebar.text_input("Points de passage (année:GtC, ...)", "2030:8, 2050:2, 2100:0")
+    try:
+        points = lire_points(texte_points)
+    except ValueError:
+        st.sidebar.error("Format attendu : 2030:8, 2050:2")
+        points = []
+    # Sans point valide, les émissions restent constantes
+    scenarios[scenario] = lambda depart, annees_futures: lineaire_par_morceaux(
+        annees_futures, [(annees_futures[0] - 1, depart)] + points
+    )
 
 # Étendre les années pour couvrir 2020 à 2100
-extended_years = list(range(2021, 2101))
-annees_extended = list(annees) + extended_years
-new_emissions = emissions.tolist()
+extended_years = np.arange(2021, 2101)
+annees_extended = np.concatenate((annees, extended_years))
 
 # Ajouter les émissions selon le scénario choisi
-for year in extended_years:
-    if scenario == "Business as usual":
-        new_emissions.append(new_emissions[-1])  # Émissions constantes après 2020
-    elif scenario == "-2%/an":
-        new_emissions.append(new_emissions[-1] * 0.98)  # Réduction de 2% par an
-    elif scenario == "-5%/an":
-        new_emissions.append(new_emissions[-1] * 0.95)  # Réduction de 5% par an
+new_emissions = prolonger_historique(emissions, scenarios[scenario](emissions[-1], extended_years))[0]
 
 # Afficher les émissions avec distinction entre historique et scénario
 st.title("Simulation des Émissions Anthropiques")
@@ -47,22 +67,13 @@ plt.legend()
 plt.grid()
 st.pyplot(plt)
 
-# Initialisation des réservoirs de carbone exprimé en tonne
-P = [2300]  # Réservoir Terre (Gt)
-A = [590]   # Réservoir Atmosphère (Gt)
-E = [39000] # Réservoir Eau (Gt)
-F = [0]     # Émissions anthropiques cumulées (GtC)
-T = [0]     # Captage technologique (GtC)
-temperature = [0.0]  # Température initiale (°C)
-temps = [1850]       # Année de départ
-
-# Curseurs pour ajuster les valeurs initiales
+# Curseurs pour ajuster les valeurs initiales (réservoirs exprimés en GtC)
 st.sidebar.header("Paramètres ajustables initiaux en 1850")
-P[0] = st.sidebar.slider("Réservoir Terre (GtC)", 0, 5000, 2300, 10)
-A[0] = st.sidebar.slider("Réservoir Atmosphère (GtC)", 0, 1000, 590, 10)
-E[0] = st.sidebar.slider("Réservoir Océan (GtC)", 0, 100000, 39000, 1000)
-F[0] = st.sidebar.slider("Émissions anthropiques cumulées (GtC)", 0.0, 10.0, 0.0, 0.1)
-T[0] = st.sidebar.slider("Captage technologique (GtC)", 0.0, 10.0, 0.0, 0.1)
+P0 = st.sidebar.slider("Réservoir Terre (GtC)", 0, 5000, 2300, 10)
+A0 = st.sidebar.slider("Réservoir Atmosphère (GtC)", 0, 1000, 590, 10)
+E0 = st.sidebar.slider("Réservoir Océan (GtC)", 0, 100000, 39000, 1000)
+F0 = st.sidebar.slider("Émissions anthropiques cumulées (GtC)", 0.0, 10.0, 0.0, 0.1)
+T0 = st.sidebar.slider("Captage technologique (GtC)", 0.0, 10.0, 0.0, 0.1)
 
 kt = st.sidebar.slider("Taux de captage technologique (%)", 0.0, 0.5, 0.0, step=0.1)
 kp = st.sidebar.slider("Taux d'échange atmosphère → terre (%)", 0.0, 50.0, 20.3, step=0.1)
@@ -71,50 +82,34 @@ kr_land = st.sidebar.slider("Taux d'échange terre → atmosphère (%)", 98.0, 1
 kr_water = st.sidebar.slider("Taux d'échange océan → atmosphère (%)", 97.00, 100.00, 99.77, step=0.01)
 lambda_param = st.sidebar.slider("Constante de sensibilité climatique (°C/GtC)", 2.0, 6.0, 4.0, step=0.1)
 
-# Simulation avec les données étendues
-for i in range(len(annees_extended) - 1):
-    # Flux anthropiques
-    flux_from_anthropogenic = new_emissions[i]
-
-    # Flux atmosphère vers autres réservoirs
-    flux_to_land = kp * A[-1] / 100
-    flux_to_water = ke * A[-1] / 100
-    flux_to_tech = kt * A[-1] / 100
-
-    # Flux réémis vers l'atmosphère
-    flux_from_land = kr_land / 100 * flux_to_land
-    flux_from_water = kr_water / 100 * flux_to_water
-
-    # Mise à jour des réservoirs
-    F.append(F[-1] + flux_from_anthropogenic)  # Émissions cumulées
-    A.append(A[-1] + flux_from_anthropogenic - flux_to_land - flux_to_water - flux_to_tech + flux_from_land + flux_from_water)
-    P.append(P[-1] + flux_to_land - flux_from_land)
-    E.append(E[-1] + flux_to_water - flux_from_water)
-    T.append(T[-1] + flux_to_tech)
-    temperature.append(lambda_param * np.log(A[-1] / A[0]))
-    temps.append(temps[-1] + 1)
-
-# Synchronisation des longueurs
-min_length = min(len(temps), len(A), len(F), len(P), len(E), len(T), len(temperature))
-temps = temps[:min_length]
-A = A[:min_length]
-F = F[:min_length]
-P = P[:min_length]
-E = E[:min_length]
-T = T[:min_length]
-temperature = temperature[:min_length]
+# Simulation avec les données étendues : la période historique est mise en cache et
+# seul le scénario est simulé à partir de l'état de 2020 (réponse calculée une seule fois)
+reponse = reponse_impulsionnelle(kp, ke, kt, kr_land, kr_water)
+historique = simulation_historique(emissions, annees[0], P0, A0, E0, F0, T0, kp, ke, kt, kr_land, kr_water, lambda_param)
+etat_2020 = etat_a(historique, annees[-1])
+resultat = raccorder(historique, reprendre(reponse, etat_2020, new_emissions[len(annees) - 1:], lambda_param))
+temps = resultat.temps
+temperature = resultat.temperature
+A_rel = variation_relative(resultat.A)
+P_rel = variation_relative(resultat.P)
+E_rel = variation_relative(resultat.E)
+
+# Découpage historique / scénario
+n_hist = len(annees)
+hist = slice(None, n_hist)
+scen = slice(n_hist, None)
 
 # Graphiques mis à jour avec les parties scénarios
 st.title(f"Simulation des Scénarios : {scenario}")
 
 # Réservoirs de carbone
 plt.figure()
-plt.plot(temps[:len(annees)], [val / A[0] * 100 for val in A[:len(annees)]], '-o', label="Atmosphère (1850-2020)", color='blue')
-plt.plot(temps[len(annees):], [val / A[0] * 100 for val in A[len(annees):]], '-o', label="Atmosphère (2020-2100)", color='red')
-plt.plot(temps[:len(annees)], [val / P[0] * 100 for val in P[:len(annees)]], '-o', label="Terre (1850-2020)", color='green')
-plt.plot(temps[len(annees):], [val / P[0] * 100 for val in P[len(annees):]], '-o', label="Terre (2020-2100)", color='orange')
-plt.plot(temps[:len(annees)], [val / E[0] * 100 for val in E[:len(annees)]], '-o', label="Océan (1850-2020)", color='purple')
-plt.plot(temps[len(annees):], [val / E[0] * 100 for val in E[len(annees):]], '-o', label="Océan (2020-2100)", color='brown')
+plt.plot(temps[hist], A_rel[hist], '-o', label="Atmosphère (1850-2020)", color='blue')
+plt.plot(temps[scen], A_rel[scen], '-o', label="Atmosphère (2020-2100)", color='red')
+plt.plot(temps[hist], P_rel[hist], '-o', label="Terre (1850-2020)", color='green')
+plt.plot(temps[scen], P_rel[scen], '-o', label="Terre (2020-2100)", color='orange')
+plt.plot(temps[hist], E_rel[hist], '-o', label="Océan (1850-2020)", color='purple')
+plt.plot(temps[scen], E_rel[scen], '-o', label="Océan (2020-2100)", color='brown')
 plt.title("Évolution des Réservoirs de CO2")
 plt.xlabel("Année")
 plt.ylabel("Variation de la Concentration de Carbone (%)")
@@ -124,8 +119,8 @@ st.pyplot(plt)
 
 # Température globale
 plt.figure()
-plt.plot(temps[:len(annees)], temperature[:len(annees)], '-o', label="Température (1850-2020)", color='blue')
-plt.plot(temps[len(annees):], temperature[len(annees):], '-o', label="Température (2020-2100)", color='red')
+plt.plot(temps[hist], temperature[hist], '-o', label="Température (1850-2020)", color='blue')
+plt.plot(temps[scen], temperature[scen], '-o', label="Température (2020-2100)", color='red')
 plt.title("Évolution de la Température Globale")
 plt.xlabel("Année")
 plt.ylabel("Température (°C)")
@@ -133,8 +128,173 @@ plt.grid()
 plt.legend()
 st.pyplot(plt)
 
+# Mode ensemble : enveloppes d'incertitude autour des paramètres choisis
+st.sidebar.header("Mode ensemble")
+mode_ensemble = st.sidebar.checkbox("Afficher les enveloppes d'incertitude (5/50/95 %)")
+if mode_ensemble:
+    n_tirages = st.sidebar.slider("Nombre de tirages", 1000, 100000, 10000, step=1000)
+    incertitude = st.sidebar.slider("Incertitude sur les paramètres (±%)", 1.0, 20.0, 5.0, step=0.5)
+
+    valeurs_centrales = {
+        "P0": P0, "A0": A0, "E0": E0,
+        "kp": kp, "ke": ke, "kt": kt,
+        "kr_land": kr_land, "kr_water": kr_water, "lambda_param": lambda_param,
+    }
+    bornes = {}
+    for nom, valeur in valeurs_centrales.items():
+        bas, haut = valeur * (1 - incertitude / 100), valeur * (1 + incertitude / 100)
+        # Les taux de réémission ne peuvent dépasser 100 %
+        if nom in ("kr_land", "kr_water"):
+            haut = min(haut, 100.0)
+        bornes[nom] = (bas, haut)
+
+    echantillons = echantillonner_hypercube(bornes, n_tirages, seed=0)
+    bandes = simuler_ensemble(new_emissions, echantillons, relatif=True, annee_debut=annees_extended[0])
+
+    st.title("Enveloppes d'incertitude de l'ensemble")
+
+    plt.figure()
+    for serie, nom, couleur in [(bandes.A, "Atmosphère", "blue"), (bandes.P, "Terre", "green"), (bandes.E, "Océan", "purple")]:
+        plt.fill_between(bandes.temps, serie[0], serie[2], color=couleur, alpha=0.2)
+        plt.plot(bandes.temps, serie[1], label=f"{nom} (médiane, 5-95 %)", color=couleur)
+    plt.title("Réservoirs de CO2 : enveloppes de l'ensemble")
+    plt.xlabel("Année")
+    plt.ylabel("Variation de la Concentration de Carbone (%)")
+    plt.legend()
+    plt.grid()
+    st.pyplot(plt)
+
+    plt.figure()
+    plt.fill_between(bandes.temps, bandes.temperature[0], bandes.temperature[2], color='red', alpha=0.2)
+    plt.plot(bandes.temps, bandes.temperature[1], label="Température (médiane, 5-95 %)", color='red')
+    plt.title("Température Globale : enveloppe de l'ensemble")
+    plt.xlabel("Année")
+    plt.ylabel("Température (°C)")
+    plt.grid()
+    plt.legend()
+    st.pyplot(plt)
+
+# Mode inverse : réduction annuelle nécessaire pour respecter un plafond de température
+st.sidebar.header("Mode inverse")
+mode_inverse = st.sidebar.checkbox("Chercher la trajectoire respectant un plafond de température")
+if mode_inverse:
+    plafond = st.sidebar.slider("Plafond de température (°C)", 0.5, 4.0, 1.5, step=0.1)
+
+    st.title(f"Trajectoire d'émissions sous le plafond de {plafond} °C")
+    try:
+        taux, emissions_plafond = reduction_sous_plafond(
+            reponse, emissions, len(extended_years), plafond, A0, lambda_param
+        )
+    except ValueError as erreur:
+        st.error(str(erreur))
+    else:
+        st.write(f"**Réduction annuelle minimale après 2020 :** {taux * 100:.2f} %/an")
+        resultat_plafond = simuler_reponse(
+            reponse, emissions_plafond, P0, A0, E0, F0, T0, lambda_param, annee_debut=annees_extended[0]
+        )
+
+        plt.figure()
+        plt.plot(extended_years, emissions_plafond[len(annees):], '-o', label="Émissions sous plafond", color='green')
+        plt.plot(extended_years, new_emissions[len(annees):], '-o', label=f"Scénario choisi : {scenario}", color='red')
+        plt.title("Émissions anthropiques compatibles avec le plafond")
+        plt.xlabel("Année")
+        plt.ylabel("Gt de Carbone / an")
+        plt.legend()
+        plt.grid()
+        st.pyplot(plt)
+
+        plt.figure()
+        plt.plot(resultat_plafond.temps, resultat_plafond.temperature, '-o', label="Température sous plafond", color='green')
+        plt.axhline(plafond, color='black', linestyle='--', label="Plafond")
+        plt.title("Température Globale sous plafond")
+        plt.xlabel("Année")
+        plt.ylabel("Température (°C)")
+        plt.grid()
+        plt.legend()
+        st.pyplot(plt)
+
+# Inventaire régional : contributions de chaque région, simulées en un seul passage
+st.sidebar.header("Inventaire régional")
+chemin_inventaire = st.sidebar.text_input("Fichier CSV (Region;Year;Emissions)", "")
+if chemin_inventaire:
+    inventaire = None
+    if not os.path.exists(chemin_inventaire):
+        st.error(f"Fichier introuvable : {chemin_inventaire}")
+    else:
+        n_classement = st.sidebar.slider("Nombre de régions affichées", 5, 50, 10)
+        try:
+            inventaire = charger_inventaire(chemin_inventaire)
+        except ValueError as erreur:
+            st.error(str(erreur))
+    if inventaire is not None:
+        reponse_regions = reponse_impulsionnelle(kp, ke, kt, kr_land, kr_water)
+        contributions = simuler_regions(
+            reponse_regions, inventaire.emissions, P0, A0, E0, F0, T0, lambda_param,
+            annee_debut=inventaire.annees[0],
+        )
+
+        st.title(f"Contributions régionales au réchauffement en {inventaire.annees[-1]}")
+        classement = classer_regions(contributions.temperature[:, -1], inventaire.regions, n_classement)
+        noms = [nom for nom, _ in classement][::-1]
+        valeurs = [valeur for _, valeur in classement][::-1]
+
+        plt.figure(figsize=(8, max(4, len(noms) * 0.3)))
+        plt.barh(noms, valeurs, color='red')
+        plt.title(f"Top {len(noms)} des contributions à la température")
+        plt.xlabel("Température (°C)")
+        plt.grid(axis='x')
+        st.pyplot(plt)
 
+# Comparaison de plusieurs scénarios, simulés ensemble en un seul appel
+st.sidebar.header("Comparaison de scénarios")
+scenarios_compares = st.sidebar.multiselect("Scénarios à comparer", list(scenarios))
+if scenarios_compares:
+    futurs = matrice_scenarios(scenarios_compares, emissions[-1], extended_years, scenarios)
+    suites = reprendre(reponse, etat_2020, prolonger_historique(emissions[-1:], futurs), lambda_param)
+    resultat_compare = raccorder(historique, suites)
 
+    st.title("Comparaison des scénarios")
+    plt.figure()
+    for nom, temperature_scenario in zip(scenarios_compares, resultat_compare.temperature):
+        plt.plot(resultat_compare.temps, temperature_scenario, label=nom)
+    plt.title("Évolution de la Température Globale par scénario")
+    plt.xlabel("Année")
+    plt.ylabel("Température (°C)")
+    plt.grid()
+    plt.legend()
+    st.pyplot(plt)
 
+# Simulation « et si » : reprise à partir d'une année avec arrêt des émissions
+st.sidebar.header("Simulation « et si »")
+mode_reprise = st.sidebar.checkbox("Arrêter les émissions à partir d'une année")
+if mode_reprise:
+    annee_arret = st.sidebar.slider("Année d'arrêt des émissions", int(annees_extended[0]), int(annees_extended[-1]), 2030)
+    etat_arret = etat_a(resultat, annee_arret)
+    suite_arret = reprendre(reponse, etat_arret, np.zeros(int(annees_extended[-1]) - annee_arret + 1), lambda_param)
 
+    st.title(f"Arrêt des émissions en {annee_arret}")
+    plt.figure()
+    plt.plot(temps, temperature, '-o', label=f"Scénario choisi : {scenario}", color='red')
+    plt.plot(suite_arret.temps, suite_arret.temperature, '-o', label=f"Arrêt en {annee_arret}", color='green')
+    plt.title("Évolution de la Température Globale")
+    plt.xlabel("Année")
+    plt.ylabel("Température (°C)")
+    plt.grid()
+    plt.legend()
+    st.pyplot(plt)
 
+# Sensibilités de la température finale à chaque paramètre (une seule intégration)
+st.sidebar.header("Sensibilités")
+mode_sensibilites = st.sidebar.checkbox("Afficher les sensibilités de la température finale")
+if mode_sensibilites:
+    sensibilites = sensibilites_temperature(new_emissions, {
+        "kp": kp, "ke": ke, "kt": kt, "kr_land": kr_land, "kr_water": kr_water,
+        "lambda_param": lambda_param, "A0": A0,
+    })
+    st.title(f"Sensibilités de la température en {annees_extended[-1]}")
+    st.write(f"**Température finale :** {float(sensibilites.temperature):.2f} °C")
+    st.table({
+        "Paramètre": list(PARAMETRES_SENSIBLES),
+        "∂T/∂paramètre": [float(sensibilites.d_temperature[nom]) for nom in PARAMETRES_SENSIBLES],
+        "∂A/∂paramètre (GtC)": [float(sensibilites.d_A[nom]) for nom in PARAMETRES_SENSIBLES],
+    })
@@ -0,0 +1,144 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+# Expression compilée : texte normalisé, variables, dérivées partielles (texte) et fonctions
+# NumPy vectorisées de la valeur et de chaque dérivée, appelées avec les variables dans l'ordre
+Evaluateur = namedtuple("Evaluateur", ["expression", "variables", "derivees", "valeur", "partielles"])
+
+
+# Fonctions et constantes SymPy utilisables dans une expression saisie
+FONCTIONS_AUTORISEES = (
+    "sin", "cos", "tan", "asin", "acos", "atan", "sinh", "cosh", "tanh",
+    "exp", "log", "sqrt", "Abs", "sign", "pi", "E",
+)
+
+# Lexèmes acceptés : nombres, noms, opérateurs arithmétiques, parenthèses, virgules, espaces.
+# Tout autre caractère (point hors d'un nombre, crochets, deux-points, guillemets…) est refusé.
+LEXEMES = re.compile(
+    r"\s+|(?P<nombre>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)|(?P<nom>[A-Za-z_]\w*)|\*\*|[-+*/^(),]"
+)
+
+
+LONGUEUR_MAX_NOMBRE = 30  # Caractères d'un nombre littéral
+CHIFFRES_MAX = 1000  # Ordre de grandeur (chiffres décimaux) d'une puissance constante
+
+
+# Contrôle du texte avant toute analyse : parse_expr évalue le code produit, seuls des
+# nombres, les `variables` et les FONCTIONS_AUTORISEES peuvent donc y parvenir
+def _verifier_lexemes(texte, variables):
+    position = 0
+    while position < len(texte):
+        lexeme = LEXEMES.match(texte, position)
+        if lexeme is None:
+            raise ValueError(f"Caractère non autorisé dans l'expression : {texte[position]!r}")
+        nombre = lexeme.group("nombre")
+        if nombre is not None and len(nombre) > LONGUEUR_MAX_NOMBRE:
+            raise ValueError(f"Nombre trop long dans l'expression : {nombre[:LONGUEUR_MAX_NOMBRE]}…")
+        nom = lexeme.group("nom")
+        if nom is not None and nom not in variables and nom not in FONCTIONS_AUTORISEES:
+            raise ValueError(f"Symboles inconnus : {nom}")
+        position = lexeme.end()
+
+
+# Contrôle de l'arbre non évalué avant doit() : une puissance constante ne doit
+# pas produire de nombre de plus de CHIFFRES_MAX chiffres (9**9**9 bloquerait le processus).
+# Le parcours postfixe vérifie les exposants internes avant d'évaluer ceux qui les contiennent.
+def _verifier_puissances(sp, expression):
+    for noeud in sp.postorder_traversal(expression):
+        if not isinstance(noeud, sp.Pow) or noeud.free_symbols:
+            continue
+        exposant, base = (abs(terme.evalf()) for terme in (noeud.exp, noeud.base))
+        if not (exposant.is_finite and base.is_finite):  # zoo, nan… : refusés après doit()
+            continue
+        chiffres = exposant * abs(sp.log(base, 10)) if base else 0
+        if not chiffres <= CHIFFRES_MAX:
+            raise ValueError(f"Puissance trop grande : ({noeud.base})**({noeud.exp})")
+
+
+# Expression saisie analysée, dérivée et compilée une seule fois par texte (cache LRU) :
+# les réexécutions de l'application n'appellent plus SymPy. SymPy n'est importé qu'à la
+# première compilation. Le texte est filtré avant l'analyse, qui se fait sans fonctions
+# intégrées de Python et sans évaluation ; les puissances démesurées sont refusées avant
+# doit(). L'expression et ses dérivées sont évaluées une fois à l'essai et doivent être
+# réelles.
+# Lève ValueError si le texte n'est pas une expression valide des `variables`.
+@lru_cache(maxsize=64)
+def compiler_expression(texte, variables=("x", "y", "z")):
+    import sympy as sp
+    from sympy.parsing.sympy_parser import convert_xor, parse_expr, standard_transformations
+
+    _verifier_lexemes(texte, variables)
+    symboles = sp.symbols(variables, real=True)
+    globales = {"__builtins__": {}, "Integer": sp.Integer, "Float": sp.Float, "Rational": sp.Rational,
+                "Symbol": sp.Symbol, "Add": sp.Add, "Mul": sp.Mul, "Pow": sp.Pow}
+    globales.update({nom: getattr(sp, nom) for nom in FONCTIONS_AUTORISEES})
+    try:
+        expression = parse_expr(
+            texte, local_dict=dict(zip(variables, symboles)), global_dict=globales,
+            transformations=standard_transformations + (convert_xor,), evaluate=False,
+        )
+    except Exception as erreur:
+        raise ValueError(f"Expression invalide : {texte}") from erreur
+    if not isinstance(expression, sp.Expr):
+        raise ValueError(f"Expression invalide : {texte}")
+    _verifier_puissances(sp, expression)
+    expression = expression.doit()
+    if not isinstance(expression, sp.Expr):
+        raise ValueError(f"Expression invalide : {texte}")
+    if expression.has(sp.zoo, sp.oo, -sp.oo, sp.nan):
+        raise ValueError(f"Expression non définie : {texte}")
+    if expression.has(sp.I):
+        raise ValueError(f"Expression à valeurs complexes : {texte}")
+
+    try:
+        derivees = [sp.diff(expression, symbole) for symbole in symboles]
+        evaluateur = Evaluateur(
+            str(expression),
+            tuple(variables),
+            {nom: str(derivee) for nom, derivee in zip(variables, derivees)},
+            _compiler(sp, symboles, expression),
+            {nom: _compiler(sp, symboles, derivee) for nom, derivee in zip(variables, derivees)},
+        )
+        essai = np.full(3, 0.5)
+        with np.errstate(all="ignore"):
+            resultats = (evaluateur.valeur(*(essai,) * len(variables)),) + gradient_expression(
+                evaluateur, *(essai,) * len(variables)
+            )
+    except Exception as erreur:
+        raise ValueError(f"Expression non évaluable : {texte}") from erreur
+    if any(np.iscomplexobj(resultat) for resultat in resultats):
+        raise ValueError(f"Expression à valeurs complexes : {texte}")
+    return evaluateur
+
+
+# Fonction NumPy d'une expression ; le résultat a toujours la forme commune des arguments,
+# même si l'expression est constante ou ne dépend pas de toutes les variables
+def _compiler(sp, symboles, expression):
+    fonction = sp.lambdify(symboles, expression, modules="numpy")
+
+    def evaluer(*valeurs):
+        forme = np.broadcast(*valeurs).shape
+        return np.broadcast_to(fonction(*valeurs), forme)
+
+    return evaluer
+
+
+# Gradient (tuple des dérivées partielles) d'un évaluateur sur des tableaux de valeurs
+def gradient_expression(evaluateur, *valeurs):
+    return tuple(evaluateur.partielles[nom](*valeurs) for nom in evaluateur.variables)
+
+
+# Valeurs de l'expression sur le volume défini par les axes 1-D (un par variable, dans
+# l'ordre), rangées avec le dernier axe en tête : (nz, ny, nx) pour (x, y, z), de sorte
+# qu'une coupe à z fixé soit un tableau contigu
+def evaluer_volume(evaluateur, *axes):
+    n = len(axes)
+    grilles = []
+    for k, axe in enumerate(axes):
+        forme = [1] * n
+        forme[n - 1 - k] = -1
+        grilles.append(np.asarray(axe).reshape(forme))
+    return np.ascontiguousarray(evaluateur.valeur(*grilles))
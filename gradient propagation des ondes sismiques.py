@@ -1,7 +1,172 @@
+import io
+import os
+import tempfile
+
 import streamlit as st
 import numpy as np
 import matplotlib.pyplot as plt
-import matplotlib.animation as animation
+
+from animation_ondes import animation_en_arriere_plan
+from instantanes import enregistrement_en_cache
+from localisation import MIN_POINTES, TEMPS_INACCESSIBLE, localiser_catalogue, tables_stations
+from modele_vitesses import MATERIAUX, ModeleVitesses, lire_couches, lire_polygones, preparer_schema
+from ondes_sismiques import VITESSES, charger_simulation, simuler_schema
+from recepteurs import grille_stations, indices_stations, ligne_stations, lire_stations, synthetiques_ricker
+from temps_trajet import table_temps_trajet
+
+MAX_STATIONS_LOCALISATION = 64  # Tables de temps de trajet calculées au plus (une par station)
+MEMOIRE_INSTANTANES = 256 * 2**20  # Au-delà (octets), les instantanés sont enregistrés sur disque
+DOSSIER_INSTANTANES = os.path.join(tempfile.gettempdir(), "ondes_sismiques")
+
+# Vitesse des ondes par milieu et type
+velocities = VITESSES
+materials = ["Roche (granite)", "Sédiments (sable)", "Eau", "Air"]
+p_velocities = [velocities["Ondes P (primaires)"][mat] for mat in materials]
+s_velocities = [velocities["Ondes S (secondaires)"][mat] for mat in materials]
+
+
+# Rendu PNG d'une figure, fermée ensuite : les images mises en cache évitent de retracer
+# les figures à chaque interaction
+def figure_png(fig):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight", dpi=100)
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+# Simulation partagée entre les sessions, recalculée seulement si le modèle, le type d'onde,
+# le nombre d'images, l'épicentre ou le réseau changent (le nombre de processus ne modifie
+# pas le résultat). La durée simulée permet au front d'onde de traverser la diagonale du
+# domaine à la vitesse moyenne du modèle. En 2-D, les ondes S polarisées hors plan (SH)
+# obéissent à la même équation scalaire.
+@st.cache_resource(max_entries=8, show_spinner="Simulation de la propagation...")
+def simulate(velocity_model, wave_type, time_steps, source, station_cells, _workers):
+    schema = preparer_schema(velocity_model, wave_type)
+    mean_velocity = float(schema.vitesses[schema.vitesses > 0].mean())
+    duree = np.sqrt(2) * max(velocity_model.forme) * velocity_model.dx / mean_velocity
+    station_indices = None if station_cells is None else np.array(station_cells, dtype=np.int64)
+
+    def run_simulation(folder=None):
+        return simuler_schema(
+            schema.coefficients, schema.dt, schema.f0, duree, source, n_images=time_steps,
+            stations=station_indices, dossier=folder, processus=_workers,
+        )
+
+    # Les gros enregistrements sont écrits sur disque au fil du calcul et relus à la demande
+    if time_steps * np.prod(velocity_model.forme) * 4 > MEMOIRE_INSTANTANES:
+        recording_key = (wave_type, velocity_model, time_steps, source, station_cells)
+        return charger_simulation(enregistrement_en_cache(DOSSIER_INSTANTANES, recording_key, run_simulation))
+    return run_simulation()
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def snapshot_png(velocity_model, wave_type, time_steps, source, station_cells, frame, _workers):
+    simulation = simulate(velocity_model, wave_type, time_steps, source, station_cells, _workers)
+    size = velocity_model.forme[0] * velocity_model.dx
+    field = simulation.images[frame]
+    amplitude = float(np.abs(field).max()) or 1.0
+    fig, ax = plt.subplots(figsize=(6, 6))
+    ax.imshow(field, cmap="seismic", extent=[0, size, 0, size], origin="lower", vmin=-amplitude, vmax=amplitude)
+    ax.set_title(f"Propagation des {wave_type} (t = {simulation.temps[frame] * 1000:.1f} ms)")
+    ax.set_xlabel("Distance (m)")
+    ax.set_ylabel("Distance (m)")
+    return figure_png(fig)
+
+
+# Sismogrammes, comparés si demandé aux synthétiques analytiques calculés aux centres des
+# mailles des stations (là où le schéma enregistre) dans le milieu de fond
+@st.cache_data(max_entries=16, show_spinner=False)
+def gathers_png(velocity_model, wave_type, time_steps, source, station_cells, compare, _workers):
+    simulation = simulate(velocity_model, wave_type, time_steps, source, station_cells, _workers)
+    schema = preparer_schema(velocity_model, wave_type)
+    n_stations, n_samples = simulation.traces.shape
+    recording_time = n_samples * simulation.dt * 1000
+    clip = float(np.percentile(np.abs(simulation.traces), 99)) or 1.0
+    gathers = [("Différences finies", simulation.traces)]
+    if compare:
+        iy, ix = np.divmod(np.array(station_cells), velocity_model.forme[1])
+        station_positions = np.column_stack((ix, iy)) * velocity_model.dx
+        synthetics = synthetiques_ricker(
+            station_positions, (source[1] * velocity_model.dx, source[0] * velocity_model.dx),
+            velocities[wave_type][velocity_model.fond], schema.f0, simulation.dt, n_samples,
+        )
+        gathers.append(("Synthétiques analytiques", synthetics))
+    fig, axes = plt.subplots(1, len(gathers), figsize=(6 * len(gathers), 5), squeeze=False)
+    for ax, (title, gather) in zip(axes[0], gathers):
+        ax.imshow(gather, cmap="seismic", aspect="auto", vmin=-clip, vmax=clip,
+                  extent=[0, recording_time, n_stations, 0])
+        ax.set_title(f"{title} ({n_stations} stations)")
+        ax.set_xlabel("Temps (ms)")
+        ax.set_ylabel("Station")
+    return figure_png(fig)
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def velocity_model_png(velocity_model, wave_type):
+    size = velocity_model.forme[0] * velocity_model.dx
+    fig, ax = plt.subplots(figsize=(6, 6))
+    im = ax.imshow(preparer_schema(velocity_model, wave_type).vitesses, cmap="viridis",
+                   extent=[0, size, 0, size], origin="lower")
+    fig.colorbar(im, ax=ax, label="Vitesse (m/s)")
+    ax.set_title(f"Modèle de vitesses des {wave_type}")
+    ax.set_xlabel("Distance (m)")
+    ax.set_ylabel("Distance (m)")
+    return figure_png(fig)
+
+
+@st.cache_data(show_spinner=False)
+def velocity_comparison_png():
+    x = np.arange(len(materials))
+    width = 0.35
+    fig, ax = plt.subplots()
+    ax.bar(x - width / 2, p_velocities, width, label="Ondes P")
+    ax.bar(x + width / 2, s_velocities, width, label="Ondes S")
+    ax.set_ylabel("Vitesse (m/s)")
+    ax.set_title("Comparaison des Vitesses d'Ondes")
+    ax.set_xticks(x)
+    ax.set_xticklabels(materials)
+    ax.legend()
+    return figure_png(fig)
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def travel_times_png(velocity_model, wave_type, source):
+    size = velocity_model.forme[0] * velocity_model.dx
+    travel_times = table_temps_trajet(velocity_model, wave_type, source)
+    fig, ax = plt.subplots(figsize=(6, 6))
+    ax.imshow(preparer_schema(velocity_model, wave_type).vitesses, cmap="Greys", extent=[0, size, 0, size],
+              origin="lower", alpha=0.5)
+    contours = ax.contour(travel_times * 1000, levels=15, extent=[0, size, 0, size], origin="lower", cmap="plasma")
+    ax.clabel(contours, inline=True, fontsize=8, fmt="%.0f ms")
+    ax.plot(source[1] * velocity_model.dx, source[0] * velocity_model.dx, "r*", markersize=12, label="Épicentre")
+    ax.set_title("Temps de première arrivée")
+    ax.set_xlabel("Distance (m)")
+    ax.set_ylabel("Distance (m)")
+    ax.legend()
+    return figure_png(fig)
+
+
+# Localisation des événements et carte des résultats, une fois par jeu de pointés
+@st.cache_data(max_entries=16, show_spinner="Localisation...")
+def locate(velocity_model, wave_type, located_stations, picks, true_epicenter, _workers):
+    station_tables = tables_stations(velocity_model, wave_type, located_stations)
+    located = localiser_catalogue(station_tables, picks, velocity_model.dx, processus=_workers)
+    size = velocity_model.forme[0] * velocity_model.dx
+    fig, ax = plt.subplots(figsize=(6, 6))
+    ax.imshow(preparer_schema(velocity_model, wave_type).vitesses, cmap="Greys", extent=[0, size, 0, size],
+              origin="lower", alpha=0.5)
+    ax.plot(located_stations[:, 0], located_stations[:, 1], "bv", markersize=6, label="Stations")
+    ax.plot(located.x, located.y, "go", markersize=6, label="Épicentres localisés")
+    if true_epicenter is not None:
+        ax.plot(*true_epicenter, "r*", markersize=12, label="Épicentre réel")
+    ax.set_xlim(0, size)
+    ax.set_ylim(0, size)
+    ax.set_title("Localisation par recherche sur grille")
+    ax.set_xlabel("Distance (m)")
+    ax.set_ylabel("Distance (m)")
+    ax.legend()
+    return located, figure_png(fig)
+
 
 # Titre principal
 st.title("Simulation de la Propagation des Ondes Sismiques")
@@ -14,79 +179,161 @@ st.sidebar.header("Configuration des Ondes")
 wave_type = st.sidebar.radio("Type d'Onde", ["Ondes P (primaires)", "Ondes S (secondaires)"])
 material = st.sidebar.selectbox("Milieu traversé", ["Roche (granite)", "Sédiments (sable)", "Eau", "Air"])
 time_steps = st.sidebar.slider("Nombre d'étapes temporelles", min_value=10, max_value=100, value=50)
-grid_size = st.sidebar.slider("Taille de la grille (pixels)", min_value=50, max_value=200, value=100)
+grid_size = st.sidebar.slider("Taille de la grille (pixels)", min_value=50, max_value=2000, value=100)
+workers = st.sidebar.number_input("Processus de calcul (découpage en bandes)", 1, os.cpu_count() or 1, 1)
 
-# Vitesse des ondes par milieu et type
-velocities = {
-    "Ondes P (primaires)": {"Roche (granite)": 6000, "Sédiments (sable)": 1500, "Eau": 1450, "Air": 340},
-    "Ondes S (secondaires)": {"Roche (granite)": 3500, "Sédiments (sable)": 700, "Eau": 0, "Air": 0},
-}
+# Modèle de vitesses : milieu choisi comme fond, couches et polygones optionnels
+st.sidebar.header("Modèle de vitesses")
+layered = st.sidebar.checkbox("Modèle hétérogène (couches et polygones)")
+layers, polygons = (), ()
+if layered:
+    st.sidebar.caption(f"Milieux disponibles : {', '.join(MATERIAUX)}")
+    layers_text = st.sidebar.text_area(
+        "Couches (profondeur gauche %;profondeur droite %;milieu)",
+        "30;50;Sédiments (sable)\n60;80;Roche (granite)",
+    )
+    polygons_text = st.sidebar.text_area("Polygones (x1,y1 x2,y2 ... en %;milieu)", "60,10 90,10 75,40;Eau")
+    # Tout est lu avant de construire le modèle : une erreur n'en laisse jamais une partie
+    try:
+        layers, polygons = lire_couches(layers_text, grid_size), lire_polygones(polygons_text, grid_size)
+    except ValueError as error:
+        st.sidebar.error(f"Modèle invalide : {error}")
+        st.stop()
+
+# Réseau de stations enregistrant le champ à chaque pas de temps
+st.sidebar.header("Réseau de stations")
+array_type = st.sidebar.selectbox("Disposition des stations", ["Aucune", "Ligne", "Grille", "Fichier CSV (x;y en m)"])
+stations = None
+if array_type == "Ligne":
+    n_stations = st.sidebar.slider("Nombre de stations", 2, 2000, 100)
+    line_height = st.sidebar.slider("Hauteur de la ligne (% du domaine)", 0, 100, 75)
+    stations = ligne_stations((0, line_height * grid_size / 100), (grid_size, line_height * grid_size / 100), n_stations)
+elif array_type == "Grille":
+    n_columns = st.sidebar.slider("Stations par ligne", 2, 100, 20)
+    n_rows = st.sidebar.slider("Stations par colonne", 2, 100, 20)
+    stations = grille_stations(0, grid_size, 0, grid_size, n_columns, n_rows)
+elif array_type == "Fichier CSV (x;y en m)":
+    stations_path = st.sidebar.text_input("Chemin du fichier de stations", "")
+    if stations_path:
+        try:
+            stations = lire_stations(stations_path)
+        except OSError:
+            st.sidebar.error(f"Fichier introuvable : {stations_path}")
 
 # Obtenez la vitesse correspondante
 v = velocities[wave_type][material]
 
+# Coefficients du schéma précalculés et mis en cache pour ce modèle (mailles de 1 m)
+dx = 1.0
+velocity_model = ModeleVitesses((grid_size, grid_size), dx, material, layers, polygons)
+try:
+    schema = preparer_schema(velocity_model, wave_type)
+except ValueError:
+    schema = None
+
 # Gestion des cas où les ondes S ne se propagent pas
-if v == 0:
+if schema is None:
     st.error(f"Les {wave_type} ne se propagent pas dans {material}. Veuillez choisir une autre configuration.")
 else:
-    st.write(f"**Vitesse des {wave_type} dans {material}** : {v} m/s")
+    if v > 0:
+        st.write(f"**Vitesse des {wave_type} dans {material}** : {v} m/s")
 
     # **Simulation de la propagation**
     st.markdown("## Visualisation : Propagation des Ondes")
-    x = np.linspace(0, grid_size, grid_size)
-    y = np.linspace(0, grid_size, grid_size)
-    X, Y = np.meshgrid(x, y)
+    epicenter_x = st.slider("Position de l'épicentre sur X (m)", 0, grid_size, grid_size // 2)
+    epicenter_y = st.slider("Position de l'épicentre sur Y (m)", 0, grid_size, grid_size // 2)
 
-    # Fonction pour calculer le champ d'onde
-    def compute_wave(t, v):
-        return np.sin(2 * np.pi * (X + Y - v * t / grid_size))
+    # Différences finies avec source ponctuelle à l'épicentre, simulées une seule fois par
+    # jeu de paramètres : les curseurs de la station ne relancent aucun calcul. La source est
+    # ramenée dans les mailles intérieures, les seules que le Laplacien met à jour.
+    source = tuple(int(np.clip(position, 1, grid_size - 2)) for position in (epicenter_y, epicenter_x))
+    station_cells = None if stations is None else tuple(int(cell) for cell in indices_stations(stations, (grid_size, grid_size), dx))
+    simulation = simulate(velocity_model, wave_type, time_steps, source, station_cells, workers)
+    if schema.vitesses[source] == 0:
+        st.warning(f"Les {wave_type} ne se propagent pas dans le milieu de l'épicentre.")
 
-    # Animation avec Matplotlib
-    fig, ax = plt.subplots(figsize=(6, 6))
-    wave_field = compute_wave(0, v)
-    im = ax.imshow(wave_field, cmap="seismic", extent=[0, grid_size, 0, grid_size], origin="lower")
-    ax.set_title(f"Propagation des {wave_type}")
-    ax.set_xlabel("Distance (m)")
-    ax.set_ylabel("Distance (m)")
+    # Animation GIF encodée en arrière-plan pendant le rendu du reste de la page,
+    # et conservée en cache pour les mêmes paramètres
+    animation_key = (wave_type, material, grid_size, time_steps, source, layers, polygons)
+    animation_job = animation_en_arriere_plan(animation_key, simulation.images)
+    animation_slot = st.empty()
+
+    # Instantané choisi avec Matplotlib
+    frame_shown = st.slider("Instant affiché", 0, time_steps - 1, time_steps // 2)
+    st.image(snapshot_png(velocity_model, wave_type, time_steps, source, station_cells, frame_shown, workers))
 
-    def update(frame):
-        wave_field = compute_wave(frame, v)
-        im.set_data(wave_field)
-        return [im]
+    if stations is not None:
+        st.markdown("### Sismogrammes du réseau de stations")
+        compare = not layered and st.checkbox("Comparer aux synthétiques analytiques (milieu homogène)")
+        st.image(gathers_png(velocity_model, wave_type, time_steps, source, station_cells, compare, workers))
 
-    ani = animation.FuncAnimation(fig, update, frames=time_steps, interval=100, blit=True)
-    st.pyplot(fig)
+    if layered:
+        st.image(velocity_model_png(velocity_model, wave_type))
 
     # Comparaison des vitesses
     st.markdown("### Comparaison des Vitesses dans Différents Milieux")
-    materials = ["Roche (granite)", "Sédiments (sable)", "Eau", "Air"]
-    p_velocities = [velocities["Ondes P (primaires)"][mat] for mat in materials]
-    s_velocities = [velocities["Ondes S (secondaires)"][mat] for mat in materials]
-
-    x = np.arange(len(materials))
-    width = 0.35
-    fig, ax = plt.subplots()
-    ax.bar(x - width / 2, p_velocities, width, label="Ondes P")
-    ax.bar(x + width / 2, s_velocities, width, label="Ondes S")
-    ax.set_ylabel("Vitesse (m/s)")
-    ax.set_title("Comparaison des Vitesses d'Ondes")
-    ax.set_xticks(x)
-    ax.set_xticklabels(materials)
-    ax.legend()
-    st.pyplot(fig)
+    st.image(velocity_comparison_png())
 
     # Ajout d'une carte interactive pour visualiser la distance entre l'épicentre et la station
     st.markdown("### Visualisation Épicentre-Station")
-    epicenter_x = st.slider("Position de l'épicentre sur X (m)", 0, grid_size, grid_size // 2)
-    epicenter_y = st.slider("Position de l'épicentre sur Y (m)", 0, grid_size, grid_size // 2)
     station_x = st.slider("Position de la station sur X (m)", 0, grid_size, grid_size // 3)
     station_y = st.slider("Position de la station sur Y (m)", 0, grid_size, grid_size // 3)
 
     distance = np.sqrt((station_x - epicenter_x)**2 + (station_y - epicenter_y)**2)
-    arrival_time = distance / v
-
     st.write(f"**Distance entre l'épicentre et la station** : {distance:.2f} m")
-    st.write(f"**Temps d'arrivée estimé** : {arrival_time:.2f} secondes")
+    if v > 0:
+        arrival_time = distance / v
+        st.write(f"**Temps d'arrivée estimé** : {arrival_time:.2f} secondes")
+    else:
+        st.write(f"**Temps d'arrivée estimé** : non défini, les {wave_type} ne se propagent pas dans {material}")
+
+    # Première arrivée dans le modèle de vitesses réel : lecture dans la table eikonale de
+    # l'épicentre, calculée et tracée une fois par source
+    if st.checkbox("Calculer le temps de première arrivée (équation eikonale)", value=layered):
+        travel_times = table_temps_trajet(velocity_model, wave_type, source)
+        station_cell = (min(station_y, grid_size - 1), min(station_x, grid_size - 1))
+        first_arrival = travel_times[station_cell]
+        if np.isfinite(first_arrival):
+            st.write(f"**Temps de première arrivée (modèle de vitesses)** : {first_arrival * 1000:.2f} ms")
+        else:
+            st.write("**Temps de première arrivée (modèle de vitesses)** : la station n'est pas atteinte")
+        st.image(travel_times_png(velocity_model, wave_type, source))
+
+    # Problème inverse : épicentre retrouvé à partir des temps d'arrivée aux stations
+    if stations is not None and st.checkbox("Localiser l'épicentre à partir des temps d'arrivée"):
+        st.markdown("### Localisation de l'épicentre")
+        located_stations = stations[np.linspace(0, len(stations) - 1, min(len(stations), MAX_STATIONS_LOCALISATION)).astype(int)]
+        picks_source = st.radio("Temps d'arrivée", ["Synthétiques (épicentre courant)", "Catalogue CSV (un événement par ligne)"])
+        if picks_source == "Synthétiques (épicentre courant)":
+            noise = st.slider("Bruit sur les pointés (ms)", 0.0, 10.0, 1.0)
+            station_tables = tables_stations(velocity_model, wave_type, located_stations)
+            arrivals = station_tables[:, source[0], source[1]].astype(float)
+            picks = arrivals + np.random.default_rng(0).normal(0, noise / 1000, len(located_stations))
+            picks[arrivals >= TEMPS_INACCESSIBLE] = np.nan
+        else:
+            catalogue_path = st.text_input("Chemin du catalogue (temps en s ; une colonne par station)", "")
+            picks = None
+            if catalogue_path:
+                try:
+                    picks = np.genfromtxt(catalogue_path, delimiter=";", ndmin=2)
+                except OSError:
+                    st.error(f"Fichier introuvable : {catalogue_path}")
+                except ValueError as error:
+                    # Lignes de longueurs différentes, par exemple
+                    st.error(f"Catalogue mal formé : {error}")
+            if picks is not None and picks.shape[1] != len(located_stations):
+                st.error(f"Le catalogue doit avoir {len(located_stations)} colonnes (une par station).")
+                picks = None
+        if picks is not None:
+            true_epicenter = (epicenter_x, epicenter_y) if picks_source == "Synthétiques (épicentre courant)" else None
+            located, png = locate(velocity_model, wave_type, located_stations, picks, true_epicenter, workers)
+            n_unlocated = int(np.isnan(located.x).sum())
+            if n_unlocated:
+                st.warning(f"{n_unlocated} événement(s) non localisé(s) : moins de {MIN_POINTES} temps d'arrivée.")
+            if not np.isnan(located.x[0]):
+                st.write(f"**Épicentre localisé** : ({located.x[0]:.1f} m, {located.y[0]:.1f} m), "
+                         f"résidu {located.residu[0] * 1000:.2f} ms sur {len(located_stations)} stations")
+            st.image(png)
 
     # Théorie et explications
     st.markdown("""
@@ -116,3 +363,6 @@ else:
             file_name="vitesses_ondes_sismiques.csv",
             mime="text/csv"
         )
+
+    # Affichage de l'animation une fois l'encodage terminé
+    animation_slot.image(animation_job.result(), caption=f"Propagation des {wave_type}")
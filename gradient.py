@@ -2,21 +2,14 @@ import numpy as np
 import matplotlib.pyplot as plt
 import streamlit as st
 
-# Liste des fonctions disponibles
-FUNCTIONS = {
-    "Polynomiale : ax^b + cy^d": lambda x, y, a, b, c, d: a * x**b + c * y**d,
-    "Exponentielle : ae^(bx) + ce^(dy)": lambda x, y, a, b, c, d: a * np.exp(b * x) + c * np.exp(d * y),
-    "Sinusoïdale : a*sin(bx) + c*cos(dy)": lambda x, y, a, b, c, d: a * np.sin(b * x) + c * np.cos(d * y),
-    "Logarithmique : a*log(bx) + c*log(dy)": lambda x, y, a, b, c, d: a * np.log(np.abs(b * x) + 1) + c * np.log(np.abs(d * y) + 1),
-    "Tangente : a*tan(bx) + c*tan(dy)": lambda x, y, a, b, c, d: a * np.tan(b * x) + c * np.tan(d * y),
-}
-
-# Gradient de la fonction (approximatif par dérivation numérique)
-def grad_f(f, x, y, a, b, c, d):
-    h = 1e-5  # Petits pas pour l'approximation
-    df_dx = (f(x + h, y, a, b, c, d) - f(x - h, y, a, b, c, d)) / (2 * h)
-    df_dy = (f(x, y + h, a, b, c, d) - f(x, y - h, a, b, c, d)) / (2 * h)
-    return df_dx, df_dy
+from matplotlib.collections import LineCollection
+
+from champs_gradient import (
+    FUNCTIONS, NATURES, determinant_hessien, evaluer_champ, evaluer_derivees, laplacien, pas_fleches, points_critiques,
+)
+from trajectoires_gradient import ARRET_BLOQUE, ARRET_BORD, ARRET_CRITIQUE, arrivees, bassins, decouper, grille_depart, tracer_trajectoires
+
+MAX_TRAJECTOIRES_TRACEES = 500
 
 # Interface utilisateur Streamlit
 st.title("Visualisation Interactive du Gradient")
@@ -24,7 +17,6 @@ st.write("Explorez différentes fonctions et observez comment le gradient varie.
 
 # Sélection de la fonction
 function_name = st.selectbox("Choisissez une fonction :", list(FUNCTIONS.keys()))
-selected_function = FUNCTIONS[function_name]
 
 # Paramètres interactifs
 a = st.slider("Coefficient a", 0.1, 5.0, 1.0, 0.1)
@@ -32,24 +24,77 @@ b = st.slider("Paramètre b", 1.0, 4.0, 2.0, 0.5)
 c = st.slider("Coefficient c", 0.1, 5.0, 1.0, 0.1)
 d = st.slider("Paramètre d", 1.0, 4.0, 2.0, 0.5)
 
-# Définir l'espace des variables
-x = np.linspace(-5, 5, 30)
-y = np.linspace(-5, 5, 30)
-X, Y = np.meshgrid(x, y)
+# Définir l'espace des variables : résolution et fenêtre de zoom
+resolution = st.slider("Résolution de la grille (points par côté)", 30, 4000, 30, 10)
+x_range = st.slider("Intervalle en x", -5.0, 5.0, (-5.0, 5.0), 0.1)
+y_range = st.slider("Intervalle en y", -5.0, 5.0, (-5.0, 5.0), 0.1)
+single_precision = st.checkbox("Calcul en simple précision (float32)", value=resolution > 1000)
+
+# Calculer les valeurs de la fonction et du gradient, par blocs de lignes
+x, y, Z, U, V = evaluer_champ(
+    function_name, x_range + y_range, resolution, a, b, c, d,
+    dtype=np.float32 if single_precision else np.float64,
+)
 
-# Calculer les valeurs de la fonction et du gradient
-Z = selected_function(X, Y, a, b, c, d)
-U, V = grad_f(selected_function, X, Y, a, b, c, d)
+# Analyses du second ordre, toutes tirées d'une seule évaluation de f sur la grille bordée
+second_order = st.selectbox(
+    "Champ du second ordre en fond", ["Aucun", "Laplacien (divergence du gradient)", "Déterminant de la hessienne"]
+)
+show_critical = st.checkbox("Localiser et classer les points critiques")
 
 # Affichage
 fig, ax = plt.subplots(figsize=(8, 6))
 
+if second_order != "Aucun" or show_critical:
+    derivatives = evaluer_derivees(
+        function_name, x_range + y_range, resolution, a, b, c, d,
+        dtype=np.float32 if single_precision else np.float64,
+    )
+    if second_order != "Aucun":
+        field = laplacien(derivatives) if second_order.startswith("Laplacien") else determinant_hessien(derivatives)
+        # Échelle symétrique robuste : les pôles (tangente) ne doivent pas écraser les couleurs
+        limit = float(np.nanpercentile(np.abs(field[::pas_fleches(resolution, 500), ::pas_fleches(resolution, 500)]), 99)) or 1.0
+        image = ax.imshow(field, extent=x_range + y_range, origin="lower", cmap="PiYG", vmin=-limit, vmax=limit,
+                          aspect="auto", alpha=0.8)
+        fig.colorbar(image, ax=ax, label=second_order)
+    if show_critical:
+        critical = points_critiques(derivatives, function_name, a, b, c, d)
+        for nature, marker in zip(NATURES, ("o", "^", "X", "s")):
+            chosen = critical.nature == NATURES.index(nature)
+            if chosen.any():
+                ax.plot(critical.x[chosen], critical.y[chosen], marker, color="darkgreen", markersize=8,
+                        linestyle="none", label=f"{nature} ({np.count_nonzero(chosen)})")
+        if len(critical.x):
+            ax.legend(loc="upper right", fontsize=8)
+
 # Courbes de niveau
-contour = ax.contour(X, Y, Z, levels=20, cmap='coolwarm')
+contour = ax.contour(x, y, Z, levels=20, cmap='coolwarm')
 ax.clabel(contour, inline=True, fontsize=8)
 
-# Vecteurs du gradient
-ax.quiver(X, Y, U, V, color="black", alpha=0.7)
+# Vecteurs du gradient, sous-échantillonnés à une densité lisible à l'écran
+step = pas_fleches(resolution)
+ax.quiver(x[::step], y[::step], U[::step, ::step], V[::step, ::step], color="black", alpha=0.7)
+
+# Trajectoires de particules suivant la pente : bassins d'attraction
+if st.checkbox("Tracer les trajectoires de particules (bassins d'attraction)"):
+    direction = st.radio("Sens de déplacement", ["Descente (−∇f)", "Ascension (+∇f)"], horizontal=True)
+    seeds_per_side = st.slider("Particules par côté", 10, 150, 40)
+    domain = x_range + y_range
+    paths = tracer_trajectoires(
+        function_name, grille_depart(domain, seeds_per_side), a, b, c, d, domain,
+        sens=-1 if direction.startswith("Descente") else 1, pas=(domain[1] - domain[0]) / 200,
+    )
+    basin = bassins(paths, rayon=(domain[1] - domain[0]) / 100)
+    # Au plus MAX_TRAJECTOIRES_TRACEES chemins dessinés ; tous les départs sont colorés par bassin
+    drawn = decouper(paths)[::max(1, len(paths.longueurs) // MAX_TRAJECTOIRES_TRACEES)]
+    ax.add_collection(LineCollection(drawn, colors="dimgray", linewidths=0.6, alpha=0.6))
+    starts = paths.points[paths.debuts]
+    ax.scatter(starts[:, 0], starts[:, 1], c=np.where(basin >= 0, basin, np.nan), cmap="tab20", s=6, alpha=0.5)
+    ends = arrivees(paths)[paths.arret == ARRET_CRITIQUE]
+    ax.plot(ends[:, 0], ends[:, 1], "k*", markersize=8)
+    st.write(f"**{len(paths.longueurs)} particules** : {basin.max() + 1} bassins, "
+             f"{np.count_nonzero(paths.arret == ARRET_BORD)} sorties du domaine, "
+             f"{np.count_nonzero(paths.arret == ARRET_BLOQUE)} bloquées sur une discontinuité")
 
 # Titres et labels
 ax.set_title(f"Gradient de la fonction : {function_name}")
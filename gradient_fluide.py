@@ -5,6 +5,11 @@ import matplotlib.pyplot as plt
 import matplotlib.animation as animation
 from io import StringIO
 
+from ecoulement_darcy import PERMEABILITES, grille_reguliere, permeabilite_couches, resoudre_darcy, vitesses_centrees
+
+MAX_MAILLES = 1_000_000
+FLECHES_MAX = 40  # Lignes de courant tracées sur une grille d'au plus 40 × 40 points
+
 # Titre de l'application
 st.title("Simulation du Mouvement des Fluides Souterrains")
 st.markdown(r"""
@@ -27,12 +32,7 @@ material = st.sidebar.selectbox(
     options=["Sable", "Gravier", "Argile", "Roche poreuse"],
     index=0
 )
-material_properties = {
-    "Sable": 1e-12,
-    "Gravier": 1e-10,
-    "Argile": 1e-14,
-    "Roche poreuse": 1e-13,
-}
+material_properties = PERMEABILITES
 k = material_properties[material]
 
 # Entrées utilisateur
@@ -155,3 +155,91 @@ elif variable == "Longueur (L)":
     st.pyplot(fig2)
 pass
 
+
+
+# Écoulement dans une section d'aquifère stratifié : la loi de Darcy est résolue sur une
+# grille 2-D (longueur × épaisseur) ou 3-D (longueur × largeur × épaisseur) de mailles
+# hétérogènes, la pression ΔP étant imposée entre l'entrée et la sortie, les autres bords
+# étant imperméables. Une lentille optionnelle d'un autre matériau occupe le centre de la
+# section. Le résultat est mis en cache pour un jeu de paramètres donné.
+@st.cache_data(max_entries=4)
+def darcy_section(dimension, layers, lens, cells, L, S, delta_p, eta):
+    thickness = np.sqrt(S)
+    dimensions = (L, thickness) if dimension == "2-D" else (L, thickness, thickness)
+    shape, steps = grille_reguliere(dimensions, cells)
+    permeability = permeabilite_couches(shape, layers, axe=-1)
+    if lens is not None:
+        permeability[tuple(slice(n // 3, 2 * n // 3) for n in shape)] = material_properties[lens]
+    result = resoudre_darcy(permeability, steps, eta, {(0, 0): delta_p, (0, 1): 0.0}, epaisseur=thickness)
+    return result, steps, permeability
+
+
+st.write("### Section d'aquifère stratifié (2-D / 3-D)")
+if st.checkbox("Simuler l'écoulement dans un aquifère stratifié", value=False):
+    dimension = st.radio("Dimension du modèle", ["2-D", "3-D"], horizontal=True)
+    cells = st.select_slider(
+        "Nombre de mailles",
+        options=[10_000, 40_000, 100_000, 250_000, 500_000, MAX_MAILLES],
+        value=40_000,
+    )
+    n_layers = st.slider("Nombre de couches (de bas en haut)", min_value=1, max_value=5, value=3)
+    default_layers = ["Sable", "Gravier", "Roche poreuse", "Argile", "Sable"]
+    layers = []
+    for i in range(n_layers):
+        col1, col2 = st.columns(2)
+        layer_material = col1.selectbox(
+            f"Matériau de la couche {i + 1}", list(material_properties),
+            index=list(material_properties).index(default_layers[i]), key=f"layer_material_{i}",
+        )
+        layer_thickness = col2.number_input(
+            f"Épaisseur relative de la couche {i + 1}", min_value=0.1, max_value=10.0, value=1.0, key=f"layer_thickness_{i}"
+        )
+        layers.append((layer_thickness, layer_material))
+    lens = None
+    if st.checkbox("Ajouter une lentille au centre de la section", value=True):
+        lens = st.selectbox("Matériau de la lentille", list(material_properties), index=2)
+
+    with st.spinner("Résolution du système de Darcy..."):
+        result, steps, permeability = darcy_section(dimension, tuple(layers), lens, cells, L, S, delta_p, eta)
+
+    # Débit 1-D équivalent des couches en parallèle (sans lentille), Q = Σ k_i·S_i·ΔP / (η·L)
+    Q_layers = (permeabilite_couches(permeability.shape, layers, axe=-1)[0].mean() * delta_p * S) / (eta * L)
+    Q_out = result.flux_bords[(0, 1)]
+    st.write(f"**Mailles :** {' × '.join(map(str, permeability.shape))} ({permeability.size:,} mailles)")
+    st.write(f"**Débit sortant calculé :** {Q_out:.3e} m³/s (entrant : {-result.flux_bords[(0, 0)]:.3e} m³/s)")
+    st.write(f"**Débit 1-D des couches en parallèle (sans lentille) :** {Q_layers:.3e} m³/s")
+    st.write(f"**Gradient conjugué :** {result.iterations} itérations, résidu relatif {result.residu:.1e}")
+
+    # Coupe verticale dans l'axe de l'écoulement (milieu de la largeur en 3-D)
+    pressure = result.pression
+    vx, *_, vz = vitesses_centrees(result)
+    if dimension == "3-D":
+        middle = pressure.shape[1] // 2
+        pressure, vx, vz = pressure[:, middle], vx[:, middle], vz[:, middle]
+    thickness = np.sqrt(S)
+    extent = (0, L, 0, thickness)
+
+    fig3, (ax3, ax4) = plt.subplots(2, 1, figsize=(8, 7))
+    image = ax3.imshow(pressure.T, origin="lower", extent=extent, aspect="auto", cmap="viridis")
+    fig3.colorbar(image, ax=ax3, label="Pression (Pa)")
+    step_x = max(1, pressure.shape[0] // FLECHES_MAX)
+    step_z = max(1, pressure.shape[1] // FLECHES_MAX)
+    x = (np.arange(pressure.shape[0]) + 0.5) * steps[0]
+    z = (np.arange(pressure.shape[1]) + 0.5) * steps[-1]
+    ax3.streamplot(
+        x[::step_x], z[::step_z], vx[::step_x, ::step_z].T, vz[::step_x, ::step_z].T,
+        color="white", density=1.0, linewidth=0.7,
+    )
+    ax3.set_title("Pression et lignes de courant")
+    ax3.set_ylabel("Hauteur (m)")
+
+    speed = np.hypot(vx, vz)
+    image = ax4.imshow(
+        np.log10(np.maximum(speed, speed.max() * 1e-12)).T, origin="lower", extent=extent, aspect="auto", cmap="magma"
+    )
+    fig3.colorbar(image, ax=ax4, label="log10 |v| (m/s)")
+    ax4.set_title("Vitesse de Darcy")
+    ax4.set_xlabel("Distance (m)")
+    ax4.set_ylabel("Hauteur (m)")
+    fig3.tight_layout()
+    st.pyplot(fig3)
@@ -3,6 +3,8 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from derivees_numeriques import derivee
+
 # Titre de l'application
 st.title("Analyse du Gradient Géothermique")
 
@@ -43,7 +45,7 @@ st.pyplot(fig)
 
 # Calculs supplémentaires
 st.subheader("Calcul du Gradient Géothermique")
-temp_gradient = np.gradient(temperatures, profondeurs)
+temp_gradient = derivee(temperatures, profondeurs, ordre=4)  # Différences finies d'ordre 4
 st.write("Gradient thermique moyen :", round(temp_gradient.mean(), 2), "°C/m")
 
 # Exemple réel
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+TAILLE_MAX_CACHE = 4 * 2**30  # Taille totale (octets) des enregistrements conservés sous une racine
+PREFIXE_PROVISOIRE = "provisoire-"  # Dossiers temporaires d'enregistrements en cours d'écriture
+# Préfixes reconnus comme temporaires, dont celui de tempfile.mkdtemp des versions précédentes
+PREFIXES_TEMPORAIRES = (PREFIXE_PROVISOIRE, "tmp")
+DELAI_ABANDON = 24 * 3600  # Âge (s) au-delà duquel un dossier temporaire est considéré abandonné
+
+# Un enregistrement est un dossier contenant :
+# - images.npy : instantanés float32 (n_images, ny, nx), écrits au fil du calcul ;
+# - traces.npy : champ aux stations (n_pas, n_stations), une ligne par pas de temps ;
+# - temps.npy : instants des instantanés ;
+# - meta.json : écrit en dernier, sa présence signale un enregistrement complet.
+
+
+# Création des fichiers projetés en mémoire d'un nouvel enregistrement. Un éventuel
+# enregistrement précédent est d'abord marqué incomplet. Renvoie (images, traces),
+# traces valant None sans stations.
+def ouvrir_enregistrement(dossier, n_images, forme_image, n_pas=None, n_stations=None):
+    os.makedirs(dossier, exist_ok=True)
+    meta = os.path.join(dossier, "meta.json")
+    if os.path.exists(meta):
+        os.remove(meta)
+    images = np.lib.format.open_memmap(
+        os.path.join(dossier, "images.npy"), mode="w+", dtype=np.float32, shape=(n_images,) + tuple(forme_image)
+    )
+    traces = None
+    if n_stations is not None:
+        traces = np.lib.format.open_memmap(
+            os.path.join(dossier, "traces.npy"), mode="w+", dtype=np.float32, shape=(n_pas, n_stations)
+        )
+    return images, traces
+
+
+# Écriture sur disque des pages modifiées et des métadonnées qui valident l'enregistrement
+def fermer_enregistrement(dossier, images, traces, temps, dt, pas_spatial=1):
+    images.flush()
+    if traces is not None:
+        traces.flush()
+    np.save(os.path.join(dossier, "temps.npy"), np.asarray(temps))
+    chemin_tmp = os.path.join(dossier, "meta.json.tmp")
+    with open(chemin_tmp, "w", encoding="utf-8") as fichier:
+        json.dump({"dt": dt, "pas_spatial": pas_spatial, "traces": traces is not None}, fichier)
+    os.replace(chemin_tmp, os.path.join(dossier, "meta.json"))
+
+
+# Relecture paresseuse d'un enregistrement complet : (temps, images, dt, traces, pas_spatial).
+# Images et traces restent projetées en mémoire : seules les pages lues (une image, une
+# fenêtre, les échantillons d'une station) sont chargées. Les traces sont renvoyées sous
+# la forme (n_stations, n_pas), vue transposée du fichier. Lève FileNotFoundError si
+# l'enregistrement est absent ou inachevé.
+def lire_enregistrement(dossier):
+    with open(os.path.join(dossier, "meta.json"), encoding="utf-8") as fichier:
+        meta = json.load(fichier)
+    images = np.load(os.path.join(dossier, "images.npy"), mmap_mode="r")
+    traces = np.load(os.path.join(dossier, "traces.npy"), mmap_mode="r").T if meta["traces"] else None
+    temps = np.load(os.path.join(dossier, "temps.npy"))
+    return temps, images, meta["dt"], traces, meta["pas_spatial"]
+
+
+# Taille sur disque (octets) des fichiers d'un dossier d'enregistrement
+def _taille(dossier):
+    with os.scandir(dossier) as entrees:
+        return sum(entree.stat().st_size for entree in entrees if entree.is_file())
+
+
+# Suppression des enregistrements complets les moins récemment utilisés (date de meta.json)
+# jusqu'à ce que ceux de `racine` tiennent dans `taille_max` octets ; `garder` n'est jamais
+# supprimé. Les projections mémoire encore ouvertes sur un dossier supprimé restent valides.
+# Les dossiers temporaires comptent dans la taille totale ; ceux qui n'ont pas été modifiés
+# depuis DELAI_ABANDON (calcul interrompu avant la publication) sont supprimés.
+def _evincer(racine, taille_max, garder):
+    enregistrements = []
+    total = 0
+    for nom in os.listdir(racine):
+        dossier = os.path.join(racine, nom)
+        try:
+            if nom.startswith(PREFIXES_TEMPORAIRES):
+                with os.scandir(dossier) as entrees:
+                    modification = max([os.stat(dossier).st_mtime] + [entree.stat().st_mtime for entree in entrees])
+                if time.time() - modification > DELAI_ABANDON:
+                    shutil.rmtree(dossier, ignore_errors=True)
+                else:
+                    total += _taille(dossier)
+                continue
+            utilisation = os.stat(os.path.join(dossier, "meta.json")).st_mtime
+            enregistrements.append((utilisation, _taille(dossier), dossier))
+        except OSError:
+            continue  # Enregistrement en cours d'écriture ou déjà supprimé
+    total += sum(taille for _, taille, _ in enregistrements)
+    for _, taille, dossier in sorted(enregistrements):
+        if total <= taille_max:
+            break
+        if dossier != garder:
+            shutil.rmtree(dossier, ignore_errors=True)
+            total -= taille
+
+
+# Dossier d'enregistrement partagé pour une clé (tuple de paramètres) sous `racine`. S'il
+# n'existe pas encore, `ecrire(dossier)` le produit dans un dossier temporaire renommé
+# ensuite : un enregistrement publié n'est jamais réécrit pendant qu'on le relit, et deux
+# calculs concurrents de la même clé n'en publient qu'un. Chaque accès date l'enregistrement ;
+# après une publication, les moins récemment utilisés sont supprimés au-delà de `taille_max`.
+def enregistrement_en_cache(racine, cle, ecrire, taille_max=TAILLE_MAX_CACHE):
+    os.makedirs(racine, exist_ok=True)
+    dossier = os.path.join(racine, hashlib.sha256(repr(cle).encode()).hexdigest()[:32])
+    meta = os.path.join(dossier, "meta.json")
+    if os.path.exists(meta):
+        try:
+            os.utime(meta)
+            return dossier
+        except FileNotFoundError:
+            pass  # Supprimé entre-temps par une autre session : on le recalcule
+    provisoire = tempfile.mkdtemp(prefix=PREFIXE_PROVISOIRE, dir=racine)
+    try:
+        ecrire(provisoire)
+        os.rename(provisoire, dossier)
+    except OSError:
+        if not os.path.exists(meta):
+            raise
+    finally:
+        if os.path.exists(provisoire):
+            shutil.rmtree(provisoire)
+    _evincer(racine, taille_max, dossier)
+    return dossier
@@ -0,0 +1,141 @@
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+
+from recepteurs import indices_stations
+from temps_trajet import table_temps_trajet
+
+TEMPS_INACCESSIBLE = 1e6  # Temps (s) attribué aux mailles qu'une station n'atteint pas
+OCTETS_PAR_TEMPORAIRE = 64 * 2**20  # Taille visée d'un tableau (événements, mailles) d'un bloc
+PAS_AFFINAGE = 0.1  # Pas (en mailles) de la recherche locale autour du meilleur nœud
+MIN_POINTES = 3  # Pointés nécessaires pour déterminer (x, y, t0)
+
+# Hypocentres localisés (un élément par événement) : position (m), temps origine (s)
+# et résidu quadratique moyen (s) des temps d'arrivée ; NaN pour un événement ayant
+# moins de MIN_POINTES pointés, qui n'est pas localisé
+Localisations = namedtuple("Localisations", ["x", "y", "t0", "residu"])
+
+# Tables (n_stations, ny, nx) et leurs carrés partagés par les processus de travail
+_tables_travailleur = None
+_carres_travailleur = None
+
+
+@lru_cache(maxsize=2)
+def _tables_cellules(modele, type_onde, cellules):
+    tables = np.empty((len(cellules),) + tuple(modele.forme), dtype=np.float32)
+    for k, cellule in enumerate(cellules):
+        table = table_temps_trajet(modele, type_onde, divmod(cellule, modele.forme[1]))
+        tables[k] = np.where(np.isfinite(table), table, TEMPS_INACCESSIBLE)
+    tables.flags.writeable = False
+    return tables
+
+
+# Tables (n_stations, ny, nx) des temps de trajet de chaque station vers toutes les mailles,
+# mises en cache par réseau. Par réciprocité, la table calculée avec la station comme
+# source donne le temps épicentre -> station.
+def tables_stations(modele, type_onde, stations):
+    cellules = tuple(int(cellule) for cellule in indices_stations(stations, modele.forme, modele.dx))
+    return _tables_cellules(modele, type_onde, cellules)
+
+
+# Écart quadratique (E, N) entre les pointés de E événements (E, S), NaN si absent, et les
+# temps prédits en N nœuds (S, N), le temps origine optimal étant éliminé analytiquement :
+# Σ w d² - (Σ w d)² / Σ w avec d = pointé - temps prédit. Tout se ramène à des produits
+# matriciels, évalués pour tous les nœuds et tous les événements du bloc à la fois.
+# `carres` (tables_plates², indépendant des pointés) peut être fourni une fois pour tout
+# un catalogue ; sinon il est calculé ici. Les pointés sont centrés sur leur moyenne avant
+# le développement en float32 (des temps absolus s'y annuleraient catastrophiquement) ;
+# le temps origine renvoyé est ramené à l'échelle des pointés.
+def _ecarts(pointes, tables_plates, carres=None):
+    finis = np.isfinite(pointes)
+    poids = finis.astype(np.float32)
+    n = poids.sum(axis=1, keepdims=True)
+    moyennes = np.where(finis, pointes, 0).sum(axis=1, keepdims=True) / n
+    t = np.where(finis, pointes - moyennes, 0).astype(np.float32)
+    if carres is None:
+        carres = tables_plates * tables_plates
+
+    somme_t = t.sum(axis=1, keepdims=True)
+    somme_t2 = (t * t).sum(axis=1, keepdims=True)
+    somme_T = poids @ tables_plates
+    somme_d = somme_t - somme_T
+    somme_d2 = somme_t2 - 2 * (t @ tables_plates) + poids @ carres
+    return somme_d2 - somme_d * somme_d / n, somme_d / n + moyennes
+
+
+# Temps prédits (K, S) aux points (y, x) en mailles, par interpolation bilinéaire des tables
+def _interpoler(tables, y, x):
+    _, ny, nx = tables.shape
+    y = np.clip(y, 0, ny - 1)
+    x = np.clip(x, 0, nx - 1)
+    y0 = np.minimum(np.floor(y).astype(np.int64), ny - 2)
+    x0 = np.minimum(np.floor(x).astype(np.int64), nx - 2)
+    fy, fx = (y - y0)[:, None], (x - x0)[:, None]
+    coins = [tables[:, y0 + dy, x0 + dx_].T for dy in (0, 1) for dx_ in (0, 1)]
+    return (coins[0] * (1 - fy) * (1 - fx) + coins[1] * (1 - fy) * fx
+            + coins[2] * fy * (1 - fx) + coins[3] * fy * fx)
+
+
+# Localisation d'un bloc d'événements : recherche exhaustive sur tous les nœuds, puis
+# affinage sur une grille de ±1 maille au pas PAS_AFFINAGE autour du meilleur nœud.
+# `carres` est le carré des tables aplaties (n_stations, ny·nx), calculé par catalogue.
+def _localiser_bloc(tables, carres, pointes, dx):
+    _, ny, nx = tables.shape
+    ecarts, _ = _ecarts(pointes, tables.reshape(len(tables), -1), carres)
+    meilleurs = np.argmin(ecarts, axis=1)
+    iy, ix = np.divmod(meilleurs, nx)
+
+    decalages = np.arange(-1, 1 + PAS_AFFINAGE / 2, PAS_AFFINAGE)
+    dy, dx_ = (grille.ravel() for grille in np.meshgrid(decalages, decalages, indexing="ij"))
+    resultats = np.empty((len(pointes), 4))
+    for e in range(len(pointes)):
+        y, x = iy[e] + dy, ix[e] + dx_
+        predits = _interpoler(tables, y, x)
+        ecarts_locaux, origines = _ecarts(pointes[e:e + 1], predits.T)
+        k = int(np.argmin(ecarts_locaux[0]))
+        n = np.isfinite(pointes[e]).sum()
+        resultats[e] = (
+            np.clip(x[k], 0, nx - 1) * dx,
+            np.clip(y[k], 0, ny - 1) * dx,
+            origines[0, k],
+            np.sqrt(max(ecarts_locaux[0, k], 0) / n),
+        )
+    return resultats
+
+
+def _initialiser_travailleur(tables, carres):
+    global _tables_travailleur, _carres_travailleur
+    _tables_travailleur = tables
+    _carres_travailleur = carres
+
+
+def _localiser_bloc_travailleur(pointes, dx):
+    return _localiser_bloc(_tables_travailleur, _carres_travailleur, pointes, dx)
+
+
+# Localisation d'un catalogue d'événements à partir de leurs pointés (n_evenements,
+# n_stations), NaN pour une station sans pointé. Les événements de moins de MIN_POINTES
+# pointés ne sont pas localisés (résultats NaN). Les blocs d'événements, dimensionnés pour
+# que chaque temporaire (événements, mailles) tienne dans OCTETS_PAR_TEMPORAIRE, sont
+# répartis sur `processus` processus (1 : calcul dans le processus courant).
+def localiser_catalogue(tables, pointes, dx, processus=1):
+    pointes = np.atleast_2d(np.asarray(pointes, dtype=float))
+    resultats = np.full((len(pointes), 4), np.nan)
+    localisables = np.isfinite(pointes).sum(axis=1) >= MIN_POINTES
+    if localisables.any():
+        tables_plates = tables.reshape(len(tables), -1)
+        carres = tables_plates * tables_plates
+        retenus = pointes[localisables]
+        par_bloc = max(1, OCTETS_PAR_TEMPORAIRE // (4 * tables_plates.shape[1]))
+        blocs = [retenus[i:i + par_bloc] for i in range(0, len(retenus), par_bloc)]
+        if processus == 1 or len(blocs) == 1:
+            localises = [_localiser_bloc(tables, carres, bloc, dx) for bloc in blocs]
+        else:
+            with ProcessPoolExecutor(
+                processus, initializer=_initialiser_travailleur, initargs=(tables, carres)
+            ) as executeur:
+                localises = list(executeur.map(_localiser_bloc_travailleur, blocs, [dx] * len(blocs)))
+        resultats[localisables] = np.concatenate(localises)
+    return Localisations(*resultats.T)
@@ -0,0 +1,329 @@
+import numpy as np
+from collections import namedtuple
+from functools import lru_cache
+from scipy.signal import lfilter
+
+# Résultat d'une simulation : une série par réservoir, alignée sur `temps`
+ResultatCarbone = namedtuple("ResultatCarbone", ["temps", "P", "A", "E", "F", "T", "temperature"])
+
+# Bandes de percentiles d'un ensemble : chaque série a la forme (len(percentiles), années)
+BandesCarbone = namedtuple("BandesCarbone", ["temps", "percentiles", "A", "P", "E", "temperature"])
+
+# Coefficients de la réponse linéaire du modèle : fractions annuelles captées par chaque
+# puits sans être réémises, et part de l'atmosphère conservée d'une année sur l'autre
+ReponseCarbone = namedtuple("ReponseCarbone", ["retention", "puits_terre", "puits_ocean", "puits_tech"])
+
+# Contributions additives de chaque région (lignes) aux réservoirs et à la température ;
+# `total` est la simulation mondiale obtenue par superposition de toutes les régions
+ContributionsRegionales = namedtuple("ContributionsRegionales", ["temps", "A", "P", "E", "temperature", "total"])
+
+# État des réservoirs à une année donnée, point de reprise d'une simulation ;
+# `A_reference` est l'atmosphère de départ qui sert de référence à la température
+EtatCarbone = namedtuple("EtatCarbone", ["annee", "P", "A", "E", "F", "T", "A_reference"])
+
+# Sensibilités en fin d'horizon : valeurs de la température et de l'atmosphère, et leurs
+# dérivées par rapport à chaque paramètre de PARAMETRES_SENSIBLES (dictionnaires nom -> valeur)
+Sensibilites = namedtuple("Sensibilites", ["temperature", "A", "d_temperature", "d_A"])
+
+# Paramètres dont dépendent l'atmosphère et la température
+PARAMETRES_SENSIBLES = ("kp", "ke", "kt", "kr_land", "kr_water", "lambda_param", "A0")
+
+# Conditions initiales et taux d'échange par défaut (valeurs des curseurs de effet_serre.py)
+PARAMETRES_DEFAUT = {
+    "P0": 2300.0,
+    "A0": 590.0,
+    "E0": 39000.0,
+    "F0": 0.0,
+    "T0": 0.0,
+    "kp": 20.3,
+    "ke": 15.6,
+    "kt": 0.0,
+    "kr_land": 99.0,
+    "kr_water": 99.77,
+    "lambda_param": 4.0,
+}
+
+
+# Série cumulée préallouée : valeur initiale puis somme des flux annuels (dernier axe)
+def _cumuler(valeur_initiale, flux):
+    serie = np.empty(flux.shape[:-1] + (flux.shape[-1] + 1,))
+    serie[..., 0] = valeur_initiale
+    np.cumsum(flux, axis=-1, out=serie[..., 1:])
+    serie[..., 1:] += valeur_initiale
+    return serie
+
+
+# Fractions annuelles des puits et rétention pour des taux d'échange en % (scalaires ou tableaux)
+def _puits(kp, ke, kt, kr_land, kr_water):
+    puits_terre = kp / 100 * (1 - kr_land / 100)
+    puits_ocean = ke / 100 * (1 - kr_water / 100)
+    puits_tech = kt / 100
+    return puits_terre, puits_ocean, puits_tech, 1 - puits_terre - puits_ocean - puits_tech
+
+
+# Réponse impulsionnelle du modèle, à calculer une fois par jeu de taux d'échange (en %)
+def reponse_impulsionnelle(kp, ke, kt, kr_land, kr_water):
+    puits_terre, puits_ocean, puits_tech, retention = _puits(kp, ke, kt, kr_land, kr_water)
+    return ReponseCarbone(retention, puits_terre, puits_ocean, puits_tech)
+
+
+# Atmosphère : A0 amorti par la rétention plus les émissions convoluées avec la réponse r^k,
+# évaluée sous forme récursive par lfilter (une ou plusieurs trajectoires sur le dernier axe)
+def _atmosphere(retention, A0, emissions):
+    A = np.empty(emissions.shape)
+    A[..., 0] = A0
+    etat_initial = np.full(emissions.shape[:-1] + (1,), retention * A0)
+    A[..., 1:], _ = lfilter([1.0], [1.0, -retention], emissions[..., :-1], axis=-1, zi=etat_initial)
+    return A
+
+
+# Trajectoires complètes pour une réponse déjà calculée ; `emissions` peut être
+# une trajectoire (années,) ou un lot de trajectoires (M, années). La température est
+# mesurée par rapport à `A_reference` (par défaut A0, l'atmosphère de départ).
+def simuler_reponse(reponse, emissions, P0, A0, E0, F0, T0, lambda_param, annee_debut=1850, A_reference=None):
+    emissions = np.asarray(emissions, dtype=float)
+    n = emissions.shape[-1]
+
+    A = _atmosphere(reponse.retention, A0, emissions)
+
+    # Les autres réservoirs cumulent les flux issus de l'atmosphère
+    P = _cumuler(P0, reponse.puits_terre * A[..., :-1])
+    E = _cumuler(E0, reponse.puits_ocean * A[..., :-1])
+    T = _cumuler(T0, reponse.puits_tech * A[..., :-1])
+    F = _cumuler(F0, emissions[..., :-1])
+
+    if A_reference is None:
+        A_reference = A0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        temperature = lambda_param * np.log(A / A_reference)
+    temps = np.arange(annee_debut, annee_debut + n)
+
+    return ResultatCarbone(temps, P, A, E, F, T, temperature)
+
+
+# Simulation annuelle des réservoirs de carbone (Terre, Atmosphère, Océan)
+# `emissions` contient une valeur par année à partir de `annee_debut` ;
+# les taux kp, ke, kt, kr_land et kr_water sont exprimés en %.
+def simuler_reservoirs(emissions, P0, A0, E0, F0, T0, kp, ke, kt, kr_land, kr_water, lambda_param, annee_debut=1850):
+    reponse = reponse_impulsionnelle(kp, ke, kt, kr_land, kr_water)
+    return simuler_reponse(reponse, emissions, P0, A0, E0, F0, T0, lambda_param, annee_debut)
+
+
+# Mode inverse : plus petit taux de réduction annuel (entre 0 et 1) des émissions après
+# l'historique tel que la température reste sous `plafond` (°C) jusqu'à la fin de l'horizon.
+# Renvoie le taux et la trajectoire d'émissions complète correspondante.
+def reduction_sous_plafond(reponse, emissions_historiques, n_futur, plafond, A0, lambda_param, tolerance=1e-6):
+    historique = np.asarray(emissions_historiques, dtype=float)
+    decroissance = np.arange(1, n_futur + 1)
+    seuil = A0 * np.exp(plafond / lambda_param)
+
+    def trajectoire(taux):
+        return np.concatenate((historique, historique[-1] * (1 - taux) ** decroissance))
+
+    def respecte(taux):
+        return _atmosphere(reponse.retention, A0, trajectoire(taux)).max() <= seuil
+
+    if not respecte(1.0):
+        raise ValueError(f"Le plafond de {plafond} °C est dépassé même avec un arrêt total des émissions.")
+    if respecte(0.0):
+        return 0.0, trajectoire(0.0)
+
+    # Dichotomie : la température maximale décroît avec le taux de réduction
+    bas, haut = 0.0, 1.0
+    while haut - bas > tolerance:
+        milieu = (bas + haut) / 2
+        if respecte(milieu):
+            haut = milieu
+        else:
+            bas = milieu
+    return haut, trajectoire(haut)
+
+
+# Variation d'une série par rapport à sa valeur initiale (%)
+def variation_relative(serie):
+    serie = np.asarray(serie, dtype=float)
+    return serie / serie[..., :1] * 100
+
+
+# Tirage d'un hypercube latin : `bornes` associe à chaque paramètre un couple (min, max)
+def echantillonner_hypercube(bornes, n, seed=None):
+    rng = np.random.default_rng(seed)
+    echantillons = {}
+    for nom, (bas, haut) in bornes.items():
+        # Une valeur par strate, strates mélangées indépendamment pour chaque paramètre
+        strates = (rng.permutation(n) + rng.random(n)) / n
+        echantillons[nom] = bas + strates * (haut - bas)
+    return echantillons
+
+
+# Simulation d'un ensemble de jeux de paramètres, tous avancés ensemble année par année.
+# `parametres` associe un nom de PARAMETRES_DEFAUT à un scalaire ou à un tableau (N,) ;
+# seuls les percentiles sont conservés à chaque pas, la mémoire reste donc en O(N).
+def simuler_ensemble(emissions, parametres, percentiles=(5, 50, 95), relatif=False, annee_debut=1850):
+    emissions = np.asarray(emissions, dtype=float)
+    n = len(emissions)
+    valeurs = {**PARAMETRES_DEFAUT, **parametres}
+    valeurs = dict(zip(valeurs, np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in valeurs.values()))))
+
+    puits_terre, puits_ocean, _, retention = _puits(*(valeurs[nom] for nom in ("kp", "ke", "kt", "kr_land", "kr_water")))
+
+    A0, P0, E0 = valeurs["A0"], valeurs["P0"], valeurs["E0"]
+    A, P, E = A0.copy(), P0.copy(), E0.copy()
+
+    bandes = {nom: np.empty((len(percentiles), n)) for nom in ("A", "P", "E", "temperature")}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for i in range(n):
+            temperature = valeurs["lambda_param"] * np.log(A / A0)
+            if relatif:
+                etats = {"A": A / A0 * 100, "P": P / P0 * 100, "E": E / E0 * 100}
+            else:
+                etats = {"A": A, "P": P, "E": E}
+            etats["temperature"] = temperature
+            for nom, etat in etats.items():
+                bandes[nom][:, i] = np.percentile(etat, percentiles)
+
+            # Les puits se remplissent à partir de l'atmosphère de l'année courante
+            P = P + puits_terre * A
+            E = E + puits_ocean * A
+            A = A * retention + emissions[..., i]
+
+    temps = np.arange(annee_debut, annee_debut + n)
+    return BandesCarbone(temps, np.asarray(percentiles), bandes["A"], bandes["P"], bandes["E"], bandes["temperature"])
+
+
+# Simulation de toutes les régions d'un inventaire en un seul passage. Le modèle étant
+# linéaire, l'excès de carbone dû à chaque région se simule avec un état initial nul et
+# la somme des contributions redonne la trajectoire mondiale. La température, non
+# linéaire, est le réchauffement anthropique λ·log(A / (A0·r^k)), mesuré par rapport à la
+# trajectoire sans émissions (qui inclut la relaxation de A0), réparti au prorata de
+# l'excès atmosphérique de chaque région : contributions positives, de somme ce réchauffement.
+def simuler_regions(reponse, emissions_regionales, P0, A0, E0, F0, T0, lambda_param, annee_debut=1850):
+    emissions_regionales = np.atleast_2d(np.asarray(emissions_regionales, dtype=float))
+    n = emissions_regionales.shape[-1]
+
+    exces_A = _atmosphere(reponse.retention, 0.0, emissions_regionales)
+    exces_P = _cumuler(0.0, reponse.puits_terre * exces_A[:, :-1])
+    exces_E = _cumuler(0.0, reponse.puits_ocean * exces_A[:, :-1])
+
+    total = simuler_reponse(reponse, emissions_regionales.sum(axis=0), P0, A0, E0, F0, T0, lambda_param, annee_debut)
+    sans_emissions = _atmosphere(reponse.retention, A0, np.zeros(n))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        part = exces_A / exces_A.sum(axis=0)
+        rechauffement = lambda_param * np.log(total.A / sans_emissions)
+    temperature = np.nan_to_num(part) * rechauffement
+
+    temps = np.arange(annee_debut, annee_debut + n)
+    return ContributionsRegionales(temps, exces_A, exces_P, exces_E, temperature, total)
+
+
+# Agrégation de séries régionales (lignes) par groupe, `groupes[i]` étant le code entier
+# du groupe de la région i (continent, bloc économique...)
+def agreger_regions(valeurs, groupes, n_groupes=None):
+    valeurs = np.asarray(valeurs)
+    groupes = np.asarray(groupes)
+    if n_groupes is None:
+        n_groupes = int(groupes.max()) + 1
+    agregat = np.zeros((n_groupes,) + valeurs.shape[1:])
+    np.add.at(agregat, groupes, valeurs)
+    return agregat
+
+
+# Les `n` régions aux plus fortes valeurs, par ordre décroissant : liste de (nom, valeur)
+def classer_regions(valeurs, noms, n=10):
+    valeurs = np.asarray(valeurs)
+    n = min(n, len(valeurs))
+    if n == 0:
+        return []
+    meilleurs = np.argpartition(-valeurs, n - 1)[:n]
+    meilleurs = meilleurs[np.argsort(-valeurs[meilleurs])]
+    return [(noms[i], valeurs[i]) for i in meilleurs]
+
+
+@lru_cache(maxsize=64)
+def _simulation_historique(octets, annee_debut, P0, A0, E0, F0, T0, kp, ke, kt, kr_land, kr_water, lambda_param):
+    emissions = np.frombuffer(octets)
+    resultat = simuler_reservoirs(emissions, P0, A0, E0, F0, T0, kp, ke, kt, kr_land, kr_water, lambda_param, annee_debut)
+    # Résultat partagé entre les appels : protégé contre les modifications
+    for serie in resultat:
+        serie.flags.writeable = False
+    return resultat
+
+
+# Simulation de la période historique, mise en cache sur les émissions, les conditions
+# initiales et les taux d'échange : les changements de scénario ne la recalculent pas
+def simulation_historique(emissions, annee_debut, P0, A0, E0, F0, T0, kp, ke, kt, kr_land, kr_water, lambda_param):
+    octets = np.ascontiguousarray(emissions, dtype=float).tobytes()
+    return _simulation_historique(
+        octets, int(annee_debut), float(P0), float(A0), float(E0), float(F0), float(T0),
+        float(kp), float(ke), float(kt), float(kr_land), float(kr_water), float(lambda_param),
+    )
+
+
+# État des réservoirs d'un résultat (une seule trajectoire) à l'année `annee`
+def etat_a(resultat, annee, A_reference=None):
+    i = int(annee - resultat.temps[0])
+    if not 0 <= i < len(resultat.temps):
+        raise ValueError(f"L'année {annee} est hors de la simulation ({resultat.temps[0]}-{resultat.temps[-1]}).")
+    if A_reference is None:
+        A_reference = resultat.A[0]
+    return EtatCarbone(int(annee), resultat.P[i], resultat.A[i], resultat.E[i], resultat.F[i], resultat.T[i], A_reference)
+
+
+# Reprise d'une simulation à partir d'un état : `emissions[0]` est l'émission de l'année
+# de l'état ; la réponse (taux d'échange) peut différer de celle qui a produit l'état
+def reprendre(reponse, etat, emissions, lambda_param):
+    return simuler_reponse(
+        reponse, emissions, etat.P, etat.A, etat.E, etat.F, etat.T, lambda_param,
+        annee_debut=etat.annee, A_reference=etat.A_reference,
+    )
+
+
+# Raccordement d'un début de simulation et de sa reprise : la première année de `suite`
+# remplace la dernière de `debut`. `suite` peut contenir un lot de trajectoires.
+def raccorder(debut, suite):
+    series = []
+    for serie_debut, serie_suite in zip(debut[1:], suite[1:]):
+        serie_debut = np.broadcast_to(serie_debut[:-1], serie_suite.shape[:-1] + (len(serie_debut) - 1,))
+        series.append(np.concatenate((serie_debut, serie_suite), axis=-1))
+    temps = np.concatenate((debut.temps[:-1], suite.temps))
+    return ResultatCarbone(temps, *series)
+
+
+# Sensibilités de la température et de l'atmosphère finales à tous les paramètres, obtenues
+# par le modèle linéaire tangent en une seule intégration. Les taux n'agissent que via la
+# rétention r, donc dA/dθ = dr/dθ · S avec S(i+1) = r·S(i) + A(i) : une seule suite suffit.
+# `parametres` accepte des scalaires ou des tableaux (N,) pour traiter un ensemble.
+def sensibilites_temperature(emissions, parametres):
+    emissions = np.asarray(emissions, dtype=float)
+    n = emissions.shape[-1]
+    valeurs = {**PARAMETRES_DEFAUT, **parametres}
+    valeurs = dict(zip(valeurs, np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in valeurs.values()))))
+    kp, ke, kr_land, kr_water = valeurs["kp"], valeurs["ke"], valeurs["kr_land"], valeurs["kr_water"]
+    lambda_param, A0 = valeurs["lambda_param"], valeurs["A0"]
+
+    retention = _puits(kp, ke, valeurs["kt"], kr_land, kr_water)[-1]
+    derivees_retention = {
+        "kp": -(1 - kr_land / 100) / 100,
+        "ke": -(1 - kr_water / 100) / 100,
+        "kt": np.full_like(retention, -1 / 100),
+        "kr_land": kp / 10000,
+        "kr_water": ke / 10000,
+    }
+
+    A = A0.copy()
+    S = np.zeros_like(A)
+    for i in range(n - 1):
+        S = retention * S + A
+        A = retention * A + emissions[..., i]
+
+    d_A = {nom: derivee * S for nom, derivee in derivees_retention.items()}
+    d_A["lambda_param"] = np.zeros_like(A)
+    d_A["A0"] = retention ** (n - 1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rapport = np.log(A / A0)
+        d_temperature = {nom: lambda_param / A * d_A[nom] for nom in derivees_retention}
+        d_temperature["lambda_param"] = rapport
+        d_temperature["A0"] = lambda_param * (d_A["A0"] / A - 1 / A0)
+
+    return Sensibilites(lambda_param * rapport, A, d_temperature, d_A)
@@ -0,0 +1,114 @@
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+from ondes_sismiques import VITESSES, coefficients_schema, frequence_source, pas_de_temps_stable
+
+# Milieux disponibles, dans l'ordre de leurs codes entiers dans les grilles de matériaux
+MATERIAUX = list(VITESSES["Ondes P (primaires)"])
+
+# Description d'un modèle 2-D de `forme` (ny, nx) mailles de `dx` m, hashable pour le cache :
+# - `fond` : milieu par défaut ;
+# - `couches` : tuple de (profondeur à gauche, profondeur à droite, milieu), le milieu
+#   s'appliquant sous l'interface (éventuellement pentée) jusqu'à la couche suivante ;
+# - `polygones` : tuple de (sommets ((x, y), ...) en m, milieu), appliqués après les couches.
+# La ligne 0 de la grille est le bas du domaine (y = 0), la profondeur se mesure depuis le haut.
+ModeleVitesses = namedtuple("ModeleVitesses", ["forme", "dx", "fond", "couches", "polygones"])
+
+# Coefficients du schéma précalculés pour un modèle et un type d'onde
+SchemaPrecalcule = namedtuple("SchemaPrecalcule", ["coefficients", "dt", "f0", "vitesses"])
+
+
+# Masque des mailles dont le centre est à l'intérieur du polygone (règle pair-impair) :
+# chaque arête marque, ligne par ligne, la colonne où elle coupe l'horizontale, et la
+# parité de la somme cumulée des marques le long de la ligne donne l'intérieur
+def masque_polygone(sommets, forme, dx):
+    ny, nx = forme
+    sommets = np.asarray(sommets, dtype=float) / dx - 0.5  # En indices de mailles
+    x0, y0 = sommets[:, 0], sommets[:, 1]
+    x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+
+    lignes = np.arange(ny)[:, None]
+    traverse = (y0 <= lignes) != (y1 <= lignes)  # (ny, n_aretes)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        abscisses = x0 + (lignes - y0) * (x1 - x0) / (y1 - y0)
+    i_lignes, i_aretes = np.nonzero(traverse)
+    colonnes = np.clip(np.ceil(abscisses[i_lignes, i_aretes]), 0, nx).astype(np.int64)
+
+    marques = np.zeros((ny, nx + 1), dtype=np.int8)
+    np.add.at(marques, (i_lignes, colonnes), 1)
+    return (np.cumsum(marques[:, :nx], axis=1, dtype=np.int32) & 1).astype(bool)
+
+
+# Grille (ny, nx) des codes de milieux (indices dans MATERIAUX), mise en cache par modèle
+@lru_cache(maxsize=16)
+def grille_materiaux(modele):
+    ny, nx = modele.forme
+    codes = np.full(modele.forme, MATERIAUX.index(modele.fond), dtype=np.uint8)
+
+    profondeurs = (ny - 0.5 - np.arange(ny)) * modele.dx
+    abscisses = np.linspace(0.0, 1.0, nx)
+    for gauche, droite, milieu in modele.couches:
+        interface = gauche + (droite - gauche) * abscisses
+        codes[profondeurs[:, None] >= interface[None, :]] = MATERIAUX.index(milieu)
+
+    for sommets, milieu in modele.polygones:
+        codes[masque_polygone(sommets, modele.forme, modele.dx)] = MATERIAUX.index(milieu)
+
+    codes.flags.writeable = False
+    return codes
+
+
+# Vitesses (m/s) par maille pour un type d'onde, par indexation de la table des milieux
+def grille_vitesses(modele, type_onde):
+    table = np.array([VITESSES[type_onde][milieu] for milieu in MATERIAUX], dtype=np.float32)
+    return table[grille_materiaux(modele)]
+
+
+# Coefficients (v·dt/dx)², pas de temps stable et fréquence de source pour un modèle et un
+# type d'onde, calculés une fois : la boucle en temps n'a plus aucune table à consulter
+@lru_cache(maxsize=16)
+def preparer_schema(modele, type_onde):
+    vitesses = grille_vitesses(modele, type_onde)
+    if not (vitesses > 0).any():
+        raise ValueError(f"Les {type_onde} ne se propagent dans aucun milieu du modèle.")
+    dt = pas_de_temps_stable(float(vitesses.max()), modele.dx)
+    f0 = frequence_source(float(vitesses[vitesses > 0].min()), modele.dx)
+    coefficients = coefficients_schema(vitesses, modele.dx, dt)
+    for tableau in (vitesses, coefficients):
+        tableau.flags.writeable = False
+    return SchemaPrecalcule(coefficients, dt, f0, vitesses)
+
+
+# Couches saisies par l'utilisateur, une par ligne : "profondeur gauche;profondeur droite;milieu",
+# profondeurs en % de la hauteur du domaine (`hauteur` en m)
+def lire_couches(texte, hauteur):
+    couches = []
+    for ligne in texte.splitlines():
+        if ligne.strip():
+            gauche, droite, milieu = (morceau.strip() for morceau in ligne.split(";"))
+            if milieu not in MATERIAUX:
+                raise ValueError(f"Milieu inconnu : {milieu}")
+            couches.append((float(gauche) * hauteur / 100, float(droite) * hauteur / 100, milieu))
+    return tuple(couches)
+
+
+# Polygones saisis par l'utilisateur, un par ligne : "x1,y1 x2,y2 x3,y3;milieu",
+# coordonnées en % de la taille du domaine (`taille` en m)
+def lire_polygones(texte, taille):
+    polygones = []
+    for ligne in texte.splitlines():
+        if ligne.strip():
+            points, milieu = (morceau.strip() for morceau in ligne.split(";"))
+            if milieu not in MATERIAUX:
+                raise ValueError(f"Milieu inconnu : {milieu}")
+            for point in points.split():
+                if len(point.split(",")) != 2:
+                    raise ValueError(f"Point invalide : {point} (attendu : x,y)")
+            sommets = tuple(
+                tuple(float(valeur) * taille / 100 for valeur in point.split(","))
+                for point in points.split()
+            )
+            polygones.append((sommets, milieu))
+    return tuple(polygones)
@@ -0,0 +1,154 @@
+import multiprocessing as mp
+import os
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from ondes_sismiques import amortissement_bords, coefficients_schema, frequence_source, ondelette_ricker, pas_de_temps_stable
+
+# Tableaux partagés entre le processus principal et les processus de calcul
+TABLEAUX_PARTAGES = ("coefficients", "amortissement", "champ_0", "champ_1")
+# Démarrage des processus : forkserver (ou spawn, hors Unix), jamais fork, qui peut bloquer
+# les enfants d'un serveur multithread comme Streamlit
+METHODE_DEMARRAGE = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+
+
+# Découpage des lignes intérieures 1..ny-2 en `n` bandes contiguës [debut, fin)
+def bandes(ny, n):
+    limites = np.linspace(1, ny - 1, n + 1).round().astype(int)
+    return list(zip(limites[:-1], limites[1:]))
+
+
+def _vues(noms, forme):
+    blocs = {nom: shared_memory.SharedMemory(name=nom_bloc) for nom, nom_bloc in noms.items()}
+    vues = {nom: np.ndarray(forme, dtype=np.float32, buffer=bloc.buf) for nom, bloc in blocs.items()}
+    return blocs, vues
+
+
+# Processus de calcul : met à jour les lignes [debut, fin) à chaque pas. Les deux champs
+# partagés alternent entre p(t) et p(t - dt) ; les lignes de bord des bandes voisines
+# (halos) sont lues directement dans p(t), complet depuis la barrière du pas précédent.
+# p(t - dt) n'est lu que sur la bande propre, et l'éponge lui est appliquée au moment de
+# cet usage plutôt qu'en fin de pas, pour ne jamais modifier une ligne qu'un voisin lit :
+# une seule barrière par pas suffit.
+def _travailleur(noms, forme, debut, fin, source, signal, barriere):
+    # Les blocs restent ouverts jusqu'à la fin du processus, qui libère leurs projections
+    blocs, vues = _vues(noms, forme)
+    try:
+        coef = vues["coefficients"][debut:fin, 1:-1]
+        amortissement = vues["amortissement"][debut:fin]
+        oppose = -amortissement
+        champs = (vues["champ_0"], vues["champ_1"])
+        laplacien = np.zeros((fin - debut, forme[1]), dtype=np.float32)
+        lap = laplacien[:, 1:-1]
+        iy, ix = source
+        contient_source = debut <= iy < fin
+
+        for pas in range(len(signal)):
+            pression, precedent = champs[pas % 2], champs[(pas + 1) % 2]
+            centre = pression[debut:fin, 1:-1]
+            np.add(pression[debut + 1:fin + 1, 1:-1], pression[debut - 1:fin - 1, 1:-1], out=lap)
+            lap += pression[debut:fin, 2:]
+            lap += pression[debut:fin, :-2]
+            lap -= 4 * centre
+            lap *= coef
+
+            nouveau = precedent[debut:fin]
+            nouveau *= oppose
+            nouveau += 2 * pression[debut:fin]
+            nouveau += laplacien
+            if contient_source:
+                nouveau[iy - debut, ix] += signal[pas]
+            nouveau *= amortissement
+            barriere.wait()
+    except threading.BrokenBarrierError:
+        pass  # Simulation interrompue ou terminée par le processus principal
+
+
+# Équivalent de ondes_sismiques.iterer_acoustique, le domaine étant découpé en bandes
+# horizontales réparties sur `processus` processus (par défaut un par cœur). Les champs
+# vivent en mémoire partagée (multiprocessing.shared_memory) : aucun tableau n'est copié
+# entre processus, chaque noyau NumPy s'exécute dans son propre interpréteur sans
+# contention de GIL. Le processus principal participe à la barrière de chaque pas et
+# dispose du champ renvoyé jusqu'à la fin du pas suivant. Une source placée sur la première
+# ou la dernière ligne, qu'aucune bande ne couvre, est mise à jour par le processus principal.
+def iterer_acoustique_parallele(coefficients, dt, n_pas, source, f0, amortissement=None, processus=None):
+    coefficients = np.asarray(coefficients, dtype=np.float32)
+    forme = coefficients.shape
+    if amortissement is None:
+        amortissement = amortissement_bords(forme)
+    processus = min(processus or os.cpu_count() or 1, forme[0] - 2)
+    iy, ix = source
+    signal = (ondelette_ricker(np.arange(n_pas) * dt, f0) * coefficients[iy, ix]).astype(np.float32)
+
+    octets = int(np.prod(forme)) * 4
+    blocs = {nom: shared_memory.SharedMemory(create=True, size=octets) for nom in TABLEAUX_PARTAGES}
+    travailleurs = []
+    contexte = mp.get_context(METHODE_DEMARRAGE)
+    barriere = contexte.Barrier(processus + 1)
+    try:
+        vues = {nom: np.ndarray(forme, dtype=np.float32, buffer=bloc.buf) for nom, bloc in blocs.items()}
+        vues["coefficients"][:] = coefficients
+        vues["amortissement"][:] = amortissement
+        vues["champ_0"][:] = 0
+        vues["champ_1"][:] = 0
+
+        noms = {nom: bloc.name for nom, bloc in blocs.items()}
+        for debut, fin in bandes(forme[0], processus):
+            travailleur = contexte.Process(
+                target=_travailleur, args=(noms, forme, debut, fin, source, signal, barriere), daemon=True
+            )
+            travailleur.start()
+            travailleurs.append(travailleur)
+
+        champs = (vues["champ_0"], vues["champ_1"])
+        bord = vues["amortissement"][iy] if not 1 <= iy < forme[0] - 1 else None
+        for pas in range(n_pas):
+            if bord is not None:
+                # Même mise à jour que _travailleur, le Laplacien étant nul sur la ligne de bord ;
+                # aucun processus de calcul n'écrit cette ligne ni ne la lit dans ce tampon
+                nouveau = champs[(pas + 1) % 2][iy]
+                nouveau *= -bord
+                nouveau += 2 * champs[pas % 2][iy]
+                nouveau[ix] += signal[pas]
+                nouveau *= bord
+            barriere.wait()
+            yield pas, champs[(pas + 1) % 2]
+    finally:
+        barriere.abort()
+        for travailleur in travailleurs:
+            travailleur.join()
+        vues = champs = bord = nouveau = None
+        for bloc in blocs.values():
+            bloc.unlink()
+            try:
+                bloc.close()
+            except BufferError:
+                pass  # Champ encore référencé par l'appelant : libéré avec lui
+
+
+# Accélération forte : temps par pas sur une grille fixe pour 1 à `max_processus` processus
+def mesurer_acceleration(taille=4000, n_pas=20, max_processus=None, vitesse=6000.0, dx=1.0):
+    max_processus = max_processus or os.cpu_count() or 1
+    dt = pas_de_temps_stable(vitesse, dx)
+    coefficients = coefficients_schema(np.full((taille, taille), vitesse), dx, dt)
+    f0 = frequence_source(vitesse, dx)
+    resultats = []
+    for processus in sorted({2**k for k in range(max_processus.bit_length())} | {max_processus}):
+        debut = None
+        for pas, _ in iterer_acoustique_parallele(coefficients, dt, n_pas + 1, (taille // 2, taille // 2), f0,
+                                                  processus=processus):
+            if pas == 0:
+                debut = time.perf_counter()  # Le premier pas inclut le démarrage des processus
+        resultats.append((processus, (time.perf_counter() - debut) / n_pas))
+    return resultats
+
+
+if __name__ == "__main__":
+    resultats = mesurer_acceleration()
+    reference = resultats[0][1]
+    for processus, duree_pas in resultats:
+        print(f"{processus} processus : {duree_pas * 1000:.1f} ms/pas, accélération {reference / duree_pas:.2f}, "
+              f"efficacité {reference / duree_pas / processus:.0%}")
@@ -0,0 +1,179 @@
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from instantanes import fermer_enregistrement, lire_enregistrement, ouvrir_enregistrement
+
+# Vitesse des ondes par milieu et type (m/s)
+VITESSES = {
+    "Ondes P (primaires)": {"Roche (granite)": 6000, "Sédiments (sable)": 1500, "Eau": 1450, "Air": 340},
+    "Ondes S (secondaires)": {"Roche (granite)": 3500, "Sédiments (sable)": 700, "Eau": 0, "Air": 0},
+}
+
+# Résultat d'une simulation : instantanés décimés et traces enregistrées aux stations
+SimulationOndes = namedtuple("SimulationOndes", ["temps", "images", "dt", "traces"])
+
+COURANT = 0.5  # Nombre de Courant ; le schéma 2-D d'ordre 2 est stable jusqu'à 1/√2
+POINTS_PAR_LONGUEUR_ONDE = 12  # Échantillonnage minimal de la longueur d'onde dominante
+EPAISSEUR_ABSORBANTE = 40  # Épaisseur (mailles) de la couche absorbante sur chaque bord
+
+
+# Pas de temps stable (condition CFL) pour la vitesse maximale du modèle
+def pas_de_temps_stable(vitesse_max, dx, courant=COURANT):
+    return courant * dx / vitesse_max
+
+
+# Fréquence dominante de la source résolue par la grille pour la vitesse minimale
+def frequence_source(vitesse_min, dx, points=POINTS_PAR_LONGUEUR_ONDE):
+    return vitesse_min / (points * dx)
+
+
+# Ondelette de Ricker de fréquence dominante f0, centrée sur t0 (par défaut 1.5 / f0)
+def ondelette_ricker(t, f0, t0=None):
+    if t0 is None:
+        t0 = 1.5 / f0
+    argument = (np.pi * f0 * (np.asarray(t) - t0)) ** 2
+    return (1 - 2 * argument) * np.exp(-argument)
+
+
+# Couche éponge de Cerjan : facteur multiplicatif égal à 1 à l'intérieur, décroissant
+# vers les bords pour absorber les ondes sortantes (au plus un quart du domaine par bord)
+def amortissement_bords(forme, epaisseur=EPAISSEUR_ABSORBANTE, force=0.01):
+    facteurs = []
+    for n in forme:
+        distance = np.minimum(np.arange(n), np.arange(n)[::-1])
+        profondeur = np.clip(min(epaisseur, n // 4) - distance, 0, None)
+        facteurs.append(np.exp(-(force * profondeur) ** 2))
+    return (facteurs[0][:, None] * facteurs[1][None, :]).astype(np.float32)
+
+
+# Coefficients du schéma (v·dt/dx)² par maille, pour une vitesse scalaire ou un modèle 2-D
+def coefficients_schema(vitesses, dx, dt):
+    return ((np.asarray(vitesses, dtype=np.float32) * np.float32(dt / dx)) ** 2).astype(np.float32)
+
+
+# Propagation acoustique 2-D par différences finies explicites (ordre 2 en temps et en espace).
+# Générateur : renvoie (pas, champ de pression) à chaque pas de temps. Le champ est un tampon
+# interne réutilisé au pas suivant, à copier si on le conserve. `source` est l'indice (iy, ix)
+# de la maille source ; `coefficients` est le tableau (ny, nx) de coefficients_schema.
+def iterer_acoustique(coefficients, dt, n_pas, source, f0, amortissement=None):
+    coefficients = np.asarray(coefficients, dtype=np.float32)
+    forme = coefficients.shape
+    if amortissement is None:
+        amortissement = amortissement_bords(forme)
+
+    pression = np.zeros(forme, dtype=np.float32)
+    precedent = np.zeros(forme, dtype=np.float32)
+    laplacien = np.zeros(forme, dtype=np.float32)
+    interieur = (slice(1, -1), slice(1, -1))
+    lap, centre = laplacien[interieur], pression[interieur]
+    coef = coefficients[interieur]
+    iy, ix = source
+    # Source ponctuelle injectée comme un terme de Laplacien supplémentaire
+    signal = (ondelette_ricker(np.arange(n_pas) * dt, f0) * coefficients[iy, ix]).astype(np.float32)
+
+    for pas in range(n_pas):
+        # Laplacien à cinq points, calculé dans un tampon préalloué
+        np.add(pression[2:, 1:-1], pression[:-2, 1:-1], out=lap)
+        lap += pression[1:-1, 2:]
+        lap += pression[1:-1, :-2]
+        lap -= 4 * centre
+        lap *= coef
+
+        # p(t + dt) = 2 p(t) - p(t - dt) + (v dt / dx)² ∇²p, écrit dans le tampon de p(t - dt)
+        precedent *= -1
+        precedent += 2 * pression
+        precedent += laplacien
+        precedent[iy, ix] += signal[pas]
+        # L'éponge amortit les deux niveaux de temps, comme dans le schéma de Cerjan
+        precedent *= amortissement
+        pression *= amortissement
+        pression, precedent = precedent, pression
+        centre = pression[interieur]
+
+        yield pas, pression
+
+
+# Simulation à partir de coefficients déjà calculés. `images` contient `n_images` instantanés
+# régulièrement espacés (n_images, ny, nx) aux instants `temps`, sous-échantillonnés d'un
+# facteur `pas_spatial` ; si `stations` (indices à plat des mailles, voir
+# recepteurs.indices_stations) est fourni, `traces` enregistre le champ à chaque pas de temps
+# dt sous la forme (n_stations, n_pas), sinon il vaut None. Avec `dossier`, instantanés et
+# traces sont écrits au fil du calcul dans des fichiers projetés en mémoire (voir
+# instantanes.py) : la mémoire occupée se limite aux niveaux de temps du schéma, quelle
+# que soit la durée simulée, et le résultat est relu paresseusement depuis le disque.
+# Avec `processus` > 1, le domaine est découpé en bandes calculées en parallèle
+# (voir ondes_paralleles.py), pour un résultat identique.
+def simuler_schema(coefficients, dt, f0, duree, source, n_images=50, stations=None, dossier=None, pas_spatial=1,
+                   processus=1):
+    n_pas = max(int(np.ceil(duree / dt)), n_images)
+    decimation = n_pas // n_images
+    n_pas = n_images * decimation
+
+    forme_image = coefficients[::pas_spatial, ::pas_spatial].shape
+    n_stations = None if stations is None else len(stations)
+    if dossier is None:
+        images = np.empty((n_images,) + forme_image, dtype=np.float32)
+        traces = None if stations is None else np.empty((n_pas, n_stations), dtype=np.float32)
+    else:
+        images, traces = ouvrir_enregistrement(dossier, n_images, forme_image, n_pas, n_stations)
+    temps = np.empty(n_images)
+
+    if processus > 1:
+        # Import local : ondes_paralleles dépend de ce module
+        from ondes_paralleles import iterer_acoustique_parallele
+        iterations = iterer_acoustique_parallele(coefficients, dt, n_pas, source, f0, processus=processus)
+    else:
+        iterations = iterer_acoustique(coefficients, dt, n_pas, source, f0)
+    for pas, pression in iterations:
+        if traces is not None:
+            # Collecte de toutes les stations en une seule indexation
+            np.take(pression.reshape(-1), stations, out=traces[pas])
+        if (pas + 1) % decimation == 0:
+            k = (pas + 1) // decimation - 1
+            images[k] = pression[::pas_spatial, ::pas_spatial]
+            temps[k] = (pas + 1) * dt
+
+    if dossier is not None:
+        fermer_enregistrement(dossier, images, traces, temps, dt, pas_spatial)
+        return charger_simulation(dossier)
+    if traces is not None:
+        traces = np.ascontiguousarray(traces.T)
+    return SimulationOndes(temps, images, dt, traces)
+
+
+# Simulation enregistrée par simuler_schema(..., dossier=...), relue sans copie en mémoire
+def charger_simulation(dossier):
+    temps, images, dt, traces, _ = lire_enregistrement(dossier)
+    return SimulationOndes(temps, images, dt, traces)
+
+
+# Simulation complète dans un milieu homogène ou hétérogène (`vitesses` en m/s, scalaire
+# ou tableau (ny, nx)), avec pas de temps et fréquence de source choisis automatiquement
+def simuler_acoustique(vitesses, forme, dx, duree, source, n_images=50, f0=None, stations=None):
+    vitesses = np.broadcast_to(np.asarray(vitesses, dtype=np.float32), forme)
+    dt = pas_de_temps_stable(float(vitesses.max()), dx)
+    if f0 is None:
+        f0 = frequence_source(float(vitesses[vitesses > 0].min()), dx)
+    coefficients = coefficients_schema(vitesses, dx, dt)
+    return simuler_schema(coefficients, dt, f0, duree, source, n_images, stations)
+
+
+# Mesure du temps par pas de temps sur des grilles de taille croissante
+def mesurer_performances(tailles=(250, 500, 1000, 2000), n_pas=50, vitesse=6000.0, dx=1.0):
+    resultats = []
+    for n in tailles:
+        dt = pas_de_temps_stable(vitesse, dx)
+        coefficients = coefficients_schema(np.full((n, n), vitesse), dx, dt)
+        debut = time.perf_counter()
+        for _ in iterer_acoustique(coefficients, dt, n_pas, (n // 2, n // 2), frequence_source(vitesse, dx)):
+            pass
+        duree = time.perf_counter() - debut
+        resultats.append((n, duree / n_pas))
+    return resultats
+
+
+if __name__ == "__main__":
+    for n, duree_pas in mesurer_performances():
+        print(f"{n}×{n} : {duree_pas * 1000:.1f} ms/pas ({n * n / duree_pas / 1e6:.0f} Mmailles/s)")
@@ -0,0 +1,51 @@
+import numpy as np
+from scipy.special import hankel2
+
+from ondes_sismiques import ondelette_ricker
+
+
+# Stations lues depuis un CSV "x;y" (m) : tableau (n, 2) ; les lignes non numériques
+# (en-tête éventuel) sont ignorées
+def lire_stations(chemin, sep=";"):
+    stations = np.genfromtxt(chemin, delimiter=sep, usecols=(0, 1), ndmin=2)
+    return stations[~np.isnan(stations).any(axis=1)]
+
+
+# `n` stations régulièrement espacées entre deux points (x, y)
+def ligne_stations(debut, fin, n):
+    fractions = np.linspace(0.0, 1.0, n)[:, None]
+    return np.asarray(debut, dtype=float) + fractions * (np.asarray(fin, dtype=float) - np.asarray(debut, dtype=float))
+
+
+# Grille régulière de nx × ny stations couvrant le rectangle [xmin, xmax] × [ymin, ymax]
+def grille_stations(xmin, xmax, ymin, ymax, nx, ny):
+    X, Y = np.meshgrid(np.linspace(xmin, xmax, nx), np.linspace(ymin, ymax, ny))
+    return np.column_stack((X.ravel(), Y.ravel()))
+
+
+# Indices à plat (iy * nx + ix) des mailles les plus proches des stations, pour une
+# collecte de toutes les stations en une seule indexation du champ
+def indices_stations(stations, forme, dx):
+    ny, nx = forme
+    ix = np.clip(np.rint(stations[:, 0] / dx), 0, nx - 1).astype(np.int64)
+    iy = np.clip(np.rint(stations[:, 1] / dx), 0, ny - 1).astype(np.int64)
+    return iy * nx + ix
+
+
+# Sismogrammes synthétiques analytiques en milieu homogène pour la source de Ricker du
+# solveur : dans le domaine fréquentiel, chaque trace est le spectre de l'ondelette
+# multiplié par la fonction de Green 2-D exacte (-i/4)·H0⁽²⁾(ωr/v). Toutes les stations
+# sont traitées ensemble ; renvoie un tableau (n_stations, n_echantillons).
+def synthetiques_ricker(stations, source, vitesse, f0, dt, n_echantillons):
+    distances = np.hypot(stations[:, 0] - source[0], stations[:, 1] - source[1])
+    # Une maille de 1 m ne résout pas r < dx : la source est vue à un quart de longueur d'onde
+    distances = np.maximum(distances, vitesse / f0 / 4)
+
+    n_fft = 2 * n_echantillons  # Remplissage de zéros contre le repliement temporel
+    spectre = np.fft.rfft(ondelette_ricker(np.arange(n_echantillons) * dt, f0), n_fft)
+    pulsations = 2 * np.pi * np.fft.rfftfreq(n_fft, dt)
+
+    green = np.zeros((len(distances), len(pulsations)), dtype=complex)
+    green[:, 1:] = -0.25j * hankel2(0, pulsations[None, 1:] * distances[:, None] / vitesse)
+    traces = np.fft.irfft(green * spectre[None, :], n_fft, axis=1)[:, :n_echantillons]
+    return traces.astype(np.float32)
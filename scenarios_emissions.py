@@ -0,0 +1,69 @@
+import numpy as np
+
+
+# Décroissance géométrique : `taux` (fraction annuelle, scalaire ou tableau (S,))
+# appliqué à partir de `depart`, la dernière émission connue
+def decroissance_geometrique(depart, taux, annees):
+    taux = np.asarray(taux, dtype=float)
+    rang = np.arange(1, len(annees) + 1)
+    return depart * (1 - taux[..., None]) ** rang
+
+
+# Trajectoire linéaire par morceaux passant par les points (année, émissions) ;
+# avant le premier et après le dernier point, la valeur extrême est conservée
+def lineaire_par_morceaux(annees, points):
+    points = sorted(points)
+    annees_points = [annee for annee, _ in points]
+    valeurs_points = [valeur for _, valeur in points]
+    return np.interp(annees, annees_points, valeurs_points)
+
+
+# Plafonds par paliers : à partir de chaque année de `paliers` (année, plafond), les
+# émissions de `base` (scalaire ou trajectoire) sont limitées au plafond en vigueur
+def plafonds_par_paliers(base, annees, paliers):
+    annees = np.asarray(annees)
+    paliers = sorted(paliers)
+    debuts = np.array([annee for annee, _ in paliers])
+    plafonds = np.concatenate(([np.inf], [plafond for _, plafond in paliers]))
+    en_vigueur = plafonds[np.searchsorted(debuts, annees, side="right")]
+    return np.minimum(base, en_vigueur)
+
+
+# Points de passage saisis par l'utilisateur, au format "2030:8, 2050:2"
+def lire_points(texte):
+    points = []
+    for morceau in texte.split(","):
+        if morceau.strip():
+            annee, valeur = morceau.split(":")
+            points.append((int(annee), float(valeur)))
+    return points
+
+
+# Scénarios prédéfinis : chacun construit la trajectoire future à partir de la dernière
+# émission connue `depart` et des années à couvrir
+SCENARIOS = {
+    "Business as usual": lambda depart, annees: decroissance_geometrique(depart, 0.0, annees),
+    "-2%/an": lambda depart, annees: decroissance_geometrique(depart, 0.02, annees),
+    "-5%/an": lambda depart, annees: decroissance_geometrique(depart, 0.05, annees),
+    "Neutralité en 2050 (linéaire)": lambda depart, annees: lineaire_par_morceaux(
+        annees, [(annees[0] - 1, depart), (2050, 0.0)]
+    ),
+    "Plafonds par paliers (-25 % en 2030, -50 % en 2040, -90 % en 2050)": lambda depart, annees: plafonds_par_paliers(
+        depart, annees, [(2030, 0.75 * depart), (2040, 0.5 * depart), (2050, 0.1 * depart)]
+    ),
+}
+
+
+# Matrice (len(noms), len(annees)) des trajectoires futures de plusieurs scénarios
+def matrice_scenarios(noms, depart, annees, scenarios=SCENARIOS):
+    matrice = np.empty((len(noms), len(annees)))
+    for i, nom in enumerate(noms):
+        matrice[i] = scenarios[nom](depart, annees)
+    return matrice
+
+
+# Ajout de l'historique commun devant chaque trajectoire future (lignes de `futurs`)
+def prolonger_historique(historique, futurs):
+    futurs = np.atleast_2d(futurs)
+    historique = np.broadcast_to(np.asarray(historique, dtype=float), (futurs.shape[0], len(historique)))
+    return np.hstack((historique, futurs))
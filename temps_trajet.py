@@ -0,0 +1,86 @@
+from functools import lru_cache
+
+import numpy as np
+
+from modele_vitesses import grille_vitesses
+
+RAYON_INITIALISATION = 5  # Mailles autour de la source initialisées en ligne droite
+TOLERANCE = 1e-9  # Variation relative maximale entre deux itérations pour conclure
+MAX_ITERATIONS = 20
+
+
+# Indices à plat (grille bordée d'une maille) regroupés par diagonale, pour chacune des
+# quatre directions de balayage. Sur une diagonale, les voisins amont d'une maille sont
+# tous sur la diagonale précédente : la diagonale entière se met à jour d'un coup.
+@lru_cache(maxsize=8)
+def _diagonales(forme):
+    ny, nx = forme
+    i, j = np.mgrid[0:ny, 0:nx]
+    plats = ((i + 1) * (nx + 2) + (j + 1)).ravel()
+    balayages = []
+    for rang in ((i + j).ravel(), (i - j).ravel()):
+        ordre = np.argsort(rang, kind="stable")
+        coupures = np.flatnonzero(np.diff(rang[ordre])) + 1
+        diagonales = np.split(plats[ordre], coupures)
+        balayages.append(diagonales)
+        balayages.append(diagonales[::-1])
+    return balayages
+
+
+# Table des temps de première arrivée (s) depuis la maille `source` (iy, ix), solution de
+# l'équation eikonale |∇T| = 1 / v par balayage rapide (schéma de Godunov d'ordre 1) ;
+# les mailles de vitesse nulle ne sont jamais atteintes (temps infini), et une source de
+# vitesse nulle n'atteint aucune maille
+def temps_trajet(vitesses, dx, source):
+    vitesses = np.asarray(vitesses, dtype=float)
+    ny, nx = vitesses.shape
+    largeur = nx + 2
+    with np.errstate(divide="ignore"):
+        pas = np.pad(dx / vitesses, 1, constant_values=np.inf).ravel()  # dx × lenteur
+
+    temps = np.full((ny + 2, nx + 2), np.inf)
+    if not np.isfinite(pas[(source[0] + 1) * largeur + source[1] + 1]):
+        return temps[1:-1, 1:-1]
+    # Autour de la source, temps en ligne droite avec la lenteur de la source, seulement si
+    # tout le voisinage est du même matériau : ailleurs, une ligne droite traversant un
+    # matériau plus lent sous-estimerait des temps que les balayages ne peuvent qu'abaisser
+    iy, ix = source
+    r = RAYON_INITIALISATION
+    i, j = np.mgrid[max(iy - r, 0):min(iy + r + 1, ny), max(ix - r, 0):min(ix + r + 1, nx)]
+    pas_source = pas[(iy + 1) * largeur + ix + 1]
+    if np.all(pas[(i + 1) * largeur + j + 1] == pas_source):
+        temps[i + 1, j + 1] = np.hypot(i - iy, j - ix) * pas_source
+    else:
+        temps[iy + 1, ix + 1] = 0.0
+    temps = temps.ravel()
+
+    for _ in range(MAX_ITERATIONS):
+        precedent = temps.copy()
+        for diagonales in _diagonales((ny, nx)):
+            for indices in diagonales:
+                a = np.minimum(temps[indices - largeur], temps[indices + largeur])
+                b = np.minimum(temps[indices - 1], temps[indices + 1])
+                h = pas[indices]
+                with np.errstate(invalid="ignore"):
+                    ecart = a - b
+                    candidat = np.where(
+                        np.abs(ecart) >= h,
+                        np.minimum(a, b) + h,
+                        (a + b + np.sqrt(np.maximum(2 * h * h - ecart * ecart, 0))) / 2,
+                    )
+                # fmin ignore les NaN produits loin du front (inf - inf)
+                temps[indices] = np.fmin(temps[indices], candidat)
+        fini = np.isfinite(temps)
+        if not fini.any() or np.all(np.abs(temps[fini] - precedent[fini]) <= TOLERANCE * temps[fini].max()):
+            break
+
+    return temps.reshape(ny + 2, nx + 2)[1:-1, 1:-1]
+
+
+# Table des temps de trajet pour un modèle de vitesses, un type d'onde et une maille source,
+# mise en cache : les requêtes répétées aux stations deviennent de simples indexations
+@lru_cache(maxsize=16)
+def table_temps_trajet(modele, type_onde, source):
+    table = temps_trajet(grille_vitesses(modele, type_onde), modele.dx, source)
+    table.flags.writeable = False
+    return table
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from champs_gradient import FUNCTIONS, NATURES, evaluer_derivees, laplacien, points_critiques
+
+POLYNOMIALE, SINUSOIDALE, LOGARITHMIQUE, TANGENTE = (
+    next(nom for nom in FUNCTIONS if nom.startswith(debut))
+    for debut in ("Polynomiale", "Sinusoïdale", "Logarithmique", "Tangente")
+)
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+def test_laplacien_exact_en_simple_precision(dtype):
+    derivees = evaluer_derivees(POLYNOMIALE, (-5, 5, -5, 5), 1000, 1, 2, 1, 2, dtype=dtype)
+    assert derivees.fxx.dtype == dtype
+    np.testing.assert_allclose(laplacien(derivees), 4, rtol=1e-6)
+
+
+def test_minimum_de_la_parabole():
+    derivees = evaluer_derivees(POLYNOMIALE, (-5, 5, -5, 5), 31, 1, 2, 1, 2)
+    points = points_critiques(derivees, POLYNOMIALE, 1, 2, 1, 2)
+    assert list(points.nature) == [NATURES.index("minimum")]
+    np.testing.assert_allclose((points.x[0], points.y[0]), (0, 0), atol=1e-9)
+
+
+@pytest.mark.parametrize("resolution", [30, 200, 1000])
+def test_aucun_point_critique_sur_les_poles(resolution):
+    # a·tan(bx) + c·tan(dy) est strictement croissante entre ses pôles : aucun point critique
+    derivees = evaluer_derivees(TANGENTE, (-5, 5, -5, 5), resolution, 1, 2, 1, 2)
+    assert len(points_critiques(derivees, TANGENTE, 1, 2, 1, 2).x) == 0
+
+
+@pytest.mark.parametrize("resolution", [30, 200])
+def test_minimum_sur_un_pli(resolution):
+    derivees = evaluer_derivees(LOGARITHMIQUE, (-5, 5, -5, 5), resolution, 1, 2, 1, 2)
+    points = points_critiques(derivees, LOGARITHMIQUE, 1, 2, 1, 2)
+    assert list(points.nature) == [NATURES.index("minimum")]
+
+
+def test_points_critiques_sinusoidaux_conserves():
+    # sin(2x) + cos(2y) sur [-5, 5]² : 6 zéros de cos(2x) × 7 zéros de sin(2y)
+    derivees = evaluer_derivees(SINUSOIDALE, (-5, 5, -5, 5), 200, 1, 2, 1, 2)
+    points = points_critiques(derivees, SINUSOIDALE, 1, 2, 1, 2)
+    assert np.bincount(points.nature, minlength=len(NATURES)).tolist() == [12, 9, 21, 0]
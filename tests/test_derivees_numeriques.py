@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from derivees_numeriques import derivee, gradient_nd
+from expressions_symboliques import compiler_expression, evaluer_volume
+
+
+def test_derivee_z_du_volume_exemple():
+    # Exemple de la page des dérivées partielles : T = sin(x)·cos(y)·exp(-z), ∂T/∂z = -T
+    axes = np.linspace(0, 2 * np.pi, 50), np.linspace(0, 2 * np.pi, 50), np.round(np.arange(0.1, 2.0 + 1e-9, 0.1), 1)
+    volume = evaluer_volume(compiler_expression("sin(x)*cos(y)*exp(-z)"), *axes)
+    dT_dz = derivee(volume, axes[2], axe=0, ordre=4)
+    np.testing.assert_allclose(dT_dz, -volume, atol=1e-4)
+
+
+@pytest.mark.parametrize("ordre", [2, 4, 6])
+def test_ordre_de_convergence(ordre):
+    erreurs = []
+    for n in (40, 80):
+        x = np.linspace(0, 1, n)
+        erreurs.append(np.abs(derivee(np.sin(3 * x), x, ordre=ordre) - 3 * np.cos(3 * x))[ordre:-ordre].max())
+    assert np.log2(erreurs[0] / erreurs[1]) > ordre - 0.5
+
+
+def test_espacement_non_uniforme_et_blocs():
+    x = np.sort(np.random.default_rng(0).uniform(0, 1, 200))
+    champ = np.outer(x**2, np.ones(30))
+    attendu = np.outer(2 * x, np.ones(30))
+    np.testing.assert_allclose(derivee(champ, x, axe=0, elements_par_bloc=500), attendu, atol=1e-9)
+    gx, gy = gradient_nd(champ, (x, 1.0))
+    np.testing.assert_allclose(gx, attendu, atol=1e-9)
+    np.testing.assert_allclose(gy, 0, atol=1e-12)
@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+from expressions_symboliques import compiler_expression, gradient_expression
+
+
+def test_derivees_exactes():
+    evaluateur = compiler_expression("10*x**2 + 5*y - 2*z")
+    valeurs = np.array([1.0, 2.0]), np.array([0.0, 1.0]), np.array([3.0, 3.0])
+    np.testing.assert_allclose(evaluateur.valeur(*valeurs), [4.0, 39.0])
+    dx, dy, dz = gradient_expression(evaluateur, *valeurs)
+    np.testing.assert_allclose(dx, [20.0, 40.0])
+    np.testing.assert_allclose(dy, [5.0, 5.0])
+    np.testing.assert_allclose(dz, [-2.0, -2.0])
+
+
+@pytest.mark.parametrize("texte", ["x + sqrt(-1)*y", "log(-1)*x", "I*x", "(-2)**(1/2)*z"])
+def test_expression_complexe_refusee(texte):
+    with pytest.raises(ValueError):
+        compiler_expression(texte)
+
+
+@pytest.mark.parametrize("texte", ["9**9**9*x", "1/0", "__import__('os')", "1" * 40])
+def test_expression_dangereuse_ou_indefinie_refusee(texte):
+    with pytest.raises(ValueError):
+        compiler_expression(texte)
@@ -0,0 +1,31 @@
+import numpy as np
+
+from modele_carbone import PARAMETRES_DEFAUT, classer_regions, reponse_impulsionnelle, simuler_regions
+
+TAUX = ("kp", "ke", "kt", "kr_land", "kr_water")
+ETAT = ("P0", "A0", "E0", "F0", "T0", "lambda_param")
+
+
+def _contributions(emissions_regionales, annee_debut=1990):
+    reponse = reponse_impulsionnelle(*(PARAMETRES_DEFAUT[nom] for nom in TAUX))
+    return simuler_regions(
+        reponse, emissions_regionales, *(PARAMETRES_DEFAUT[nom] for nom in ETAT), annee_debut=annee_debut
+    )
+
+
+def test_classement_par_emissions_decroissantes():
+    contributions = _contributions(np.array([[0.05] * 30, [0.5] * 30, [0.2] * 30]))
+    finales = contributions.temperature[:, -1]
+    assert np.all(contributions.temperature >= 0)
+    classement = classer_regions(finales, ["faible", "forte", "moyenne"])
+    assert [nom for nom, _ in classement] == ["forte", "moyenne", "faible"]
+
+
+def test_somme_egale_au_rechauffement_anthropique():
+    emissions = np.array([[0.5] * 30, [0.05] * 30])
+    contributions = _contributions(emissions)
+    reponse = reponse_impulsionnelle(*(PARAMETRES_DEFAUT[nom] for nom in TAUX))
+    A0, lambda_param = PARAMETRES_DEFAUT["A0"], PARAMETRES_DEFAUT["lambda_param"]
+    sans_emissions = A0 * reponse.retention ** np.arange(30)
+    attendu = lambda_param * np.log(contributions.total.A / sans_emissions)
+    np.testing.assert_allclose(contributions.temperature.sum(axis=0), attendu, atol=1e-12)
@@ -0,0 +1,131 @@
+from collections import namedtuple
+
+import numpy as np
+
+from champs_gradient import FUNCTIONS, gradient
+
+# Motifs d'arrêt d'une particule
+ARRET_ITERATIONS = 0  # Nombre maximal de pas atteint
+ARRET_CRITIQUE = 1  # Point critique atteint (gradient quasi nul)
+ARRET_BORD = 2  # Sortie du domaine, dernier point ramené sur le bord
+ARRET_INDEFINI = 3  # Fonction ou gradient non défini (pôle, puissance d'un négatif…)
+ARRET_BLOQUE = 4  # Pas devenu négligeable sous un gradient fort (discontinuité, pôle)
+
+# Trajectoires de n particules stockées à plat (représentation « ragged ») : la particule i
+# occupe les lignes debuts[i]:debuts[i] + longueurs[i] du tableau `points` (total, 2) en
+# float32, départ compris ; `arret` donne son motif d'arrêt
+Trajectoires = namedtuple("Trajectoires", ["points", "debuts", "longueurs", "arret"])
+
+
+# Points de départ répartis sur une grille n × n couvrant le domaine (xmin, xmax, ymin, ymax)
+def grille_depart(limites, n):
+    xmin, xmax, ymin, ymax = limites
+    X, Y = np.meshgrid(np.linspace(xmin, xmax, n), np.linspace(ymin, ymax, n))
+    return np.column_stack((X.ravel(), Y.ravel()))
+
+
+# Suivi de la pente de la fonction `nom` depuis les points `depart` (n, 2) : descente si
+# sens = -1, ascension si sens = +1. Toutes les particules actives avancent ensemble d'un
+# pas de longueur `pas` dans la direction du gradient ; une particule dont le pas ne fait
+# pas progresser f divise son pas par deux. Elle s'arrête sur un point critique quand le
+# gradient devient inférieur à `tolerance`, ou quand le pas devient inférieur à `tolerance`
+# avec un gradient inférieur à `tolerance_gradient`. Un pas négligeable sous un gradient
+# plus fort, au travers duquel une composante du gradient change de signe, signale un pli
+# (|x| en x = 0 par exemple) : cette composante est annulée pour la suite du trajet, qui
+# repart avec un pas `pas` le long du pli ; sans changement de signe, c'est une
+# discontinuité (ARRET_BLOQUE). Seuls les pas effectués sont
+# enregistrés : la mémoire suit la longueur réelle des trajectoires, pas n × n_pas.
+def tracer_trajectoires(nom, depart, a, b, c, d, limites, sens=-1, pas=0.05, n_pas=500, tolerance=1e-6,
+                        tolerance_gradient=1e-3):
+    f = FUNCTIONS[nom]
+    xmin, xmax, ymin, ymax = limites
+    depart = np.asarray(depart, dtype=float)
+    n = len(depart)
+
+    # Points enregistrés pas à pas, avec le numéro de leur particule
+    particules = [np.arange(n)]
+    enregistrements = [depart.astype(np.float32)]
+    arret = np.full(n, ARRET_ITERATIONS, dtype=np.int8)
+
+    actives = np.arange(n)
+    positions = depart.copy()
+    pas_courants = np.full(n, float(pas))
+    figees = np.zeros((n, 2), dtype=bool)  # Composantes du gradient annulées le long d'un pli
+    with np.errstate(all="ignore"):
+        valeurs = f(positions[:, 0], positions[:, 1], a, b, c, d)
+
+        for _ in range(n_pas):
+            if len(actives) == 0:
+                break
+            pente = np.where(figees, 0.0, np.column_stack(gradient(nom, positions[:, 0], positions[:, 1], a, b, c, d)))
+            norme = np.hypot(pente[:, 0], pente[:, 1])
+
+            indefini = ~np.isfinite(norme) | ~np.isfinite(valeurs)
+            effondre = ~indefini & (pas_courants < tolerance)
+            critique = ~indefini & ((norme < tolerance) | (effondre & (norme < tolerance_gradient)))
+            candidats = positions + sens * pas_courants[:, None] * pente / norme[:, None]
+
+            # Pas effondré : les composantes qui changent de signe sur ce pas marquent un pli
+            pli = np.zeros_like(figees)
+            cales = np.flatnonzero(effondre & ~critique)
+            if len(cales):
+                pente_candidats = np.column_stack(gradient(nom, candidats[cales, 0], candidats[cales, 1], a, b, c, d))
+                pli[cales] = np.sign(pente_candidats) * np.sign(pente[cales]) < 0
+            replie = pli.any(axis=1)
+            bloque = effondre & ~critique & ~replie
+            dehors = ~indefini & ~critique & ~bloque & ~replie & (
+                (candidats[:, 0] < xmin) | (candidats[:, 0] > xmax) | (candidats[:, 1] < ymin) | (candidats[:, 1] > ymax)
+            )
+            nouvelles = f(candidats[:, 0], candidats[:, 1], a, b, c, d)
+            progres = ~indefini & ~critique & ~bloque & ~replie & ~dehors & (sens * (nouvelles - valeurs) > 0)
+
+            # Pas acceptés (ou sortie, ramenée sur le bord) : enregistrés à la suite de la trajectoire
+            enregistres = progres | dehors
+            candidats[dehors] = np.clip(candidats[dehors], (xmin, ymin), (xmax, ymax))
+            particules.append(actives[enregistres])
+            enregistrements.append(candidats[enregistres].astype(np.float32))
+
+            positions[progres] = candidats[progres]
+            valeurs[progres] = nouvelles[progres]
+            pas_courants[progres] = np.minimum(pas_courants[progres] * 1.5, pas)
+            pas_courants[~progres] /= 2
+            figees |= pli
+            pas_courants[replie] = pas
+
+            arret[actives[indefini]] = ARRET_INDEFINI
+            arret[actives[critique]] = ARRET_CRITIQUE
+            arret[actives[bloque]] = ARRET_BLOQUE
+            arret[actives[dehors]] = ARRET_BORD
+            restent = ~(indefini | critique | bloque | dehors)
+            actives, positions, valeurs, pas_courants, figees = (
+                actives[restent], positions[restent], valeurs[restent], pas_courants[restent], figees[restent]
+            )
+
+    # Tableau à plat : un tri stable par particule garde l'ordre des pas de chacune
+    particules = np.concatenate(particules)
+    points = np.concatenate(enregistrements)[np.argsort(particules, kind="stable")]
+    longueurs = np.bincount(particules, minlength=n)
+    debuts = np.concatenate(([0], np.cumsum(longueurs)[:-1]))
+    return Trajectoires(points, debuts, longueurs, arret)
+
+
+# Liste des trajectoires individuelles (vues sur `points`), par exemple pour un LineCollection
+def decouper(trajectoires):
+    return np.split(trajectoires.points, trajectoires.debuts[1:])
+
+
+# Points d'arrivée (n, 2) de chaque particule
+def arrivees(trajectoires):
+    return trajectoires.points[trajectoires.debuts + trajectoires.longueurs - 1]
+
+
+# Numéro de bassin de chaque particule : les particules arrêtées sur un point critique
+# sont regroupées par point d'arrivée arrondi à `rayon` ; les autres (bord, indéfini,
+# non convergées) reçoivent -1
+def bassins(trajectoires, rayon=0.05):
+    numeros = np.full(len(trajectoires.longueurs), -1, dtype=np.int64)
+    convergees = trajectoires.arret == ARRET_CRITIQUE
+    if convergees.any():
+        cases = np.round(arrivees(trajectoires)[convergees] / rayon).astype(np.int64)
+        _, numeros[convergees] = np.unique(cases, axis=0, return_inverse=True)
+    return numeros